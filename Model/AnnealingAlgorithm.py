@@ -0,0 +1,135 @@
+import math
+import random
+import time
+
+from Model import Metrics
+from Model.BaselineAlgorithm import FIFOSchedule
+from Model.CampIndex import get_index
+from Model.GeneticAlgorithm import GeneticAlgorithm
+from Model.LocalSearch import has_seat, move, move_gain, swap
+from Model.Schedule import Schedule
+
+
+SCHEDULE_TYPE = "Simulated Annealing"
+
+
+class SimulatedAnnealing:
+    # Single-trajectory search from the FIFO schedule: one schedule is changed in place, one (camper, slot) at a
+    # time, so memory stays at a schedule or two however long it runs. Moves follow Schedule.can_assign's rules
+    # and are scored with GeneticAlgorithm's fitness; worse ones are accepted with probability exp(delta / T),
+    # the temperature cooling geometrically over the wall-clock budget.
+    def __init__(self, configuration, schedule_cls=Schedule, time_limit=10.0, initial_temperature=1.0,
+                 final_temperature=0.01, preference_rate=0.8, report_interval=1.0):
+        self.configuration = configuration
+        self.schedule_cls = schedule_cls
+        self.time_limit = time_limit  # Wall-clock budget in seconds
+        # Temperatures are in units of one met preference, the fitness of a single preferred seat
+        self.total_campers = len(configuration['campers'])
+        self.unit = GeneticAlgorithm.score(0, 1, self.total_campers)
+        self.initial_temperature = initial_temperature
+        self.final_temperature = final_temperature
+        self.preference_rate = preference_rate  # Share of moves aimed at one of the camper's preferences
+        self.report_interval = report_interval  # Seconds between progress lines
+        self.camper_names = get_index(configuration).camper_names
+        self.workshops = list(configuration['workshops'])  # '-' included, to free a seat
+        self.schedule = schedule_cls.from_schedule(FIFOSchedule(configuration))
+        self.best_schedule = None  # Copy of the best schedule seen, None while the current one is the best
+        self.best_fitness = self.fitness()
+
+    def fitness(self):
+        # GeneticAlgorithm's objective, from the schedule's running totals
+        return GeneticAlgorithm.score(self.schedule.fully_scheduled, self.schedule.satisfaction_score,
+                                      self.total_campers)
+
+    def temperature(self, progress):
+        return self.unit * self.initial_temperature * (self.final_temperature / self.initial_temperature) ** progress
+
+    def gain(self, completed, satisfied):
+        return GeneticAlgorithm.score(completed, satisfied, self.total_campers)
+
+    def accept(self, delta, temperature):
+        if delta >= 0:
+            return True
+        if random.random() >= math.exp(delta / temperature):
+            return False
+        self.leave_best()  # The move is made and leads away from the current schedule
+        return True
+
+    def step(self, temperature):
+        # Propose one reassignment of a random camper's slot; True when it was made
+        schedule = self.schedule
+        camper_id = random.choice(self.camper_names)
+        camper = self.configuration['campers'][camper_id]
+        camper_age_group = camper['age_group']
+        slot = random.randrange(3)
+        if random.random() < self.preference_rate:
+            workshop = random.choice(camper['preferences'])
+        else:
+            workshop = random.choice(self.workshops)
+
+        sessions = schedule.schedule[camper_id]
+        current = sessions[slot][0]
+        if workshop == current or (workshop != "-" and any(w == workshop for w, _ in sessions)):
+            return False
+
+        if workshop == "-" or has_seat(schedule, workshop, slot, camper_age_group):
+            if not self.accept(self.gain(*move_gain(schedule, camper_id, slot, workshop)), temperature):
+                return False
+            move(schedule, camper_id, slot, workshop, camper_age_group)
+            return True
+
+        # A full session: trade seats with one of its campers of the same age group
+        if current == "-" or schedule.get_remain_sit(workshop, slot, camper_age_group) > 0:
+            return False
+        members = schedule.session_campers(workshop, slot, get_index(self.configuration).age_group_key(camper_id))
+        other_id = random.choice(members)
+        if any(w == current for w, _ in schedule.schedule[other_id]):
+            return False
+        completed, satisfied = move_gain(schedule, camper_id, slot, workshop)
+        other_completed, other_satisfied = move_gain(schedule, other_id, slot, current)
+        if not self.accept(self.gain(completed + other_completed, satisfied + other_satisfied), temperature):
+            return False
+        swap(schedule, camper_id, other_id, slot, camper_age_group)
+        return True
+
+    def leave_best(self):
+        # While best_schedule is None the current schedule is the best one, so it is copied before getting worse
+        if self.best_schedule is None:
+            self.best_schedule = self.schedule.copy()
+
+    @Metrics.timed('annealing.run')
+    def run(self):
+        start = time.perf_counter()
+        next_report = start + self.report_interval
+        moves = accepted = 0
+        while True:
+            now = time.perf_counter()
+            elapsed = now - start
+            if elapsed >= self.time_limit:
+                break
+            temperature = self.temperature(elapsed / self.time_limit)
+            if now >= next_report:
+                print(f"Annealing {elapsed:.1f}s/{self.time_limit:g}s - Temperature: {temperature / self.unit:.3f} "
+                      f"- Best Fitness: {self.best_fitness}")
+                next_report = now + self.report_interval
+
+            moves += 1
+            if self.step(temperature):
+                accepted += 1
+                fitness = self.fitness()
+                if fitness > self.best_fitness:
+                    self.best_fitness = fitness
+                    self.best_schedule = None
+
+        Metrics.count('annealing.moves', moves)
+        Metrics.count('annealing.accepted', accepted)
+        print(f"Annealing: {moves} moves, {accepted} accepted - Final Best Fitness: {self.best_fitness}")
+        if self.best_schedule is not None:
+            self.schedule = self.best_schedule
+            self.best_schedule = None
+        return self.schedule
+
+
+def anneal_solve(campers_data, schedule_cls=Schedule, time_limit=10.0):
+    annealing = SimulatedAnnealing(campers_data, schedule_cls, time_limit)
+    return annealing.run(), SCHEDULE_TYPE
@@ -1,7 +1,9 @@
-import copy
+import heapq
 
 import Model.GeneticAlgorithm
+from Model import Metrics
 # import util
+from Model.CampIndex import OLDER_GROUP, YOUNG_GROUP, get_index
 from Model.Schedule import Schedule
 from itertools import permutations
 
@@ -36,44 +38,179 @@ SCHEDULE_TYPE = 'CSP Algorithm'
 #     return satisfaction_counts
 
 
-def calc_remaining_value(camper_id, age_group, workshops_permutations, schedule):
-    score = 0
-    for perm in workshops_permutations:
-        score += sum([schedule.can_assign(camper_id, perm[i], i, age_group) for i in range(3)])  # TODO: make generic
-    return score
+def session_bit(workshop_id, slot):
+    # Position of a (workshop, slot) pair in the domain bitmasks
+    return 1 << (workshop_id * 3 + slot)
 
 
-def create_permutations(camper):
-    return list(permutations(camper['preferences'], 3))
+def can_start_with(schedule, workshop, slot, age_group):
+    # Schedule.can_assign for a camper who has nothing booked yet, which only depends on the session itself
+    free_spaces = schedule.get_remain_sit(workshop, slot, age_group)
+    if free_spaces <= 0 or not schedule.is_compatible_age_group(workshop, slot, age_group):
+        return False
+    return free_spaces < schedule.max_slots_per_workshop or schedule.can_start_new_session_in_slot(slot)
 
 
-def select_unassigned_student(campers_prefs, schedule):
-    next_camper = None
-    min_MRV = float('inf')
-    for camper in campers_prefs.items():
-        workshops_permutations = create_permutations(camper[1])
-        MRV_score = calc_remaining_value(camper[0], camper[1]['age_group'], workshops_permutations, schedule)
-        if MRV_score < min_MRV:
-            next_camper = camper
-            min_MRV = MRV_score
-    return next_camper
+class CSPTables:
+    # One-time precompute shared by MRV and LCV:
+    #   - each camper's preference tuple is interned, and campers with identical preferences share one
+    #     permutation table and one domain
+    #   - a domain is a list of bitmasks over (workshop, slot) pairs: layer k holds the workshops listed at least
+    #     k + 1 times, so duplicated preferences weigh as much as they did in the permutation count
+    #   - permutation_masks hold one 3-bit mask per distinct-workshop permutation, used by propagation to count
+    #     the full schedules a camper can still get
+    #   - feasible[age_class] is the bitmask of pairs an unassigned camper of that age class can still book; campers
+    #     whose age groups the schedule treats alike (young / old, see Schedule.is_compatible_age_group) share a class
+    def __init__(self, campers, schedule):
+        self.schedule = schedule
+        self.index = get_index(schedule.configuration)
+        self.preferences = {}
+        self.permutation_tables = {}
+        self.domains = {}
+        self.permutation_masks = {}
+        interned = {}
+        for camper_id, camper in campers.items():
+            preferences = interned.setdefault(tuple(camper['preferences']), tuple(camper['preferences']))
+            if preferences not in self.permutation_tables:
+                self.permutation_tables[preferences] = list(permutations(preferences, 3))
+                self.domains[preferences] = self.domain_layers(preferences)
+                self.permutation_masks[preferences] = self.full_masks(preferences)
+            self.preferences[camper_id] = preferences
 
+        self.age_classes = {}  # camper -> age class
+        self.age_groups = {}  # age class -> an age group of that class, for the Schedule API
+        for camper_id, camper in campers.items():
+            age_class = (self.index.camper_age_buckets[self.index.camper_ids[camper_id]],
+                         camper['age_group'] in YOUNG_GROUP or camper['age_group'] in OLDER_GROUP)
+            self.age_classes[camper_id] = age_class
+            self.age_groups.setdefault(age_class, camper['age_group'])
 
-def assign_by_LCV(camper, schedule):
-    best_perm = None
-    lcv_score = 0
-    workshops_permutations = create_permutations(camper[1])
-    for perm in workshops_permutations:
-        score = 0
-        for i in range(len(perm)):
-            free_spaces = schedule.get_remain_sit(perm[i], i, camper[1]['age_group'])
-            score += free_spaces if free_spaces < schedule.max_slots_per_workshop else 0
-            # score += 20 if schedule.get_remain_sit(perm[i], i, camper[1]['age_group']) == 4 else 0
-        # score = sum([schedule.get_remain_sit(perm[i], i, camper[1]['age_group']) for i in range(len(perm))])
+        self.feasible = {age_class: 0 for age_class in self.age_groups}
+        self.refresh([(workshop, slot) for workshop in self.index.workshop_names for slot in range(3)])
 
-        if score >= lcv_score:
-            lcv_score = score
-            best_perm = perm
+    def domain_layers(self, preferences):
+        layers = []
+        for workshop in preferences:
+            mask = sum(session_bit(self.index.workshop_ids[workshop], slot) for slot in range(3))
+            for depth, layer in enumerate(layers):
+                if not layer & mask:
+                    layers[depth] |= mask
+                    break
+            else:
+                layers.append(mask)
+        return layers
+
+    def full_masks(self, preferences):
+        return {sum(session_bit(self.index.workshop_ids[workshop], slot) for slot, workshop in enumerate(perm))
+                for perm in permutations(preferences, 3) if len(set(perm)) == 3}
+
+    def refresh(self, sessions):
+        # Re-evaluate the given (workshop, slot) pairs; returns the (workshop, age class) pairs that changed
+        changed = set()
+        for workshop, slot in sessions:
+            bit = session_bit(self.index.workshop_ids[workshop], slot)
+            for age_class, feasible in self.feasible.items():
+                if can_start_with(self.schedule, workshop, slot, self.age_groups[age_class]) != bool(feasible & bit):
+                    self.feasible[age_class] = feasible ^ bit
+                    changed.add((workshop, age_class))
+        return changed
+
+    def remaining_values(self, camper_id):
+        # Number of (permutation, slot) pairs that can_assign would accept: every feasible (preference, slot) pair
+        # appears in 6 of the 24 permutations
+        feasible = self.feasible[self.age_classes[camper_id]]
+        return 6 * sum(bin(layer & feasible).count("1") for layer in self.domains[self.preferences[camper_id]])
+
+    def full_domain_size(self, camper_id, feasible):
+        # Number of complete three-workshop schedules the camper could still book under the given feasibility mask
+        return sum(1 for mask in self.permutation_masks[self.preferences[camper_id]] if mask & feasible == mask)
+
+    def feasible_slots(self, camper_id, perm):
+        feasible = self.feasible[self.age_classes[camper_id]]
+        return sum(1 for slot, workshop in enumerate(perm)
+                   if workshop != "-" and feasible & session_bit(self.index.workshop_ids[workshop], slot))
+
+
+class MRVQueue:
+    # Min-heap of (MRV score, arrival order, camper) replacing a full rescan of the remaining campers per step.
+    # Ties go to the earliest camper, exactly like the linear scan. A booking only changes the MRV score of an
+    # unassigned camper when a session they want opens or fills up, or when a slot runs out of new sessions;
+    # CSPTables reports those changes, so only the affected campers are re-scored. Outdated heap entries are
+    # skipped lazily.
+    def __init__(self, campers, schedule, tables):
+        self.campers = campers
+        self.schedule = schedule
+        self.tables = tables
+        self.order = {camper_id: i for i, camper_id in enumerate(campers)}
+        self.scores = {camper_id: tables.remaining_values(camper_id) for camper_id in campers}
+        Metrics.count('csp.mrv_evaluations', len(self.scores))
+        self.heap = [(score, self.order[camper_id], camper_id) for camper_id, score in self.scores.items()]
+        heapq.heapify(self.heap)
+
+        # (workshop, age class) -> campers whose preferences include that workshop
+        self.wanted_by = {}
+        for camper_id, camper in campers.items():
+            for workshop in set(camper['preferences']):
+                self.wanted_by.setdefault((workshop, tables.age_classes[camper_id]), []).append(camper_id)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def pop(self):
+        while True:
+            score, _, camper_id = heapq.heappop(self.heap)
+            if self.scores.get(camper_id) == score:
+                del self.scores[camper_id]
+                return camper_id, self.campers[camper_id]
+
+    def booked(self, camper_id, sessions_per_slot):
+        self.rescore(self.affected_by(self.tables.refresh(self.touched_sessions(camper_id, sessions_per_slot))))
+
+    def touched_sessions(self, camper_id, sessions_per_slot):
+        schedule = self.schedule
+        touched = {(workshop, slot) for workshop, slot in schedule.schedule[camper_id] if workshop != "-"}
+
+        # A slot that just ran out of new sessions closes every empty session in it
+        for slot, count in enumerate(schedule.count_sessions_per_slot()):
+            if sessions_per_slot[slot] < schedule.max_sessions_per_slot <= count:
+                touched.update((workshop, slot) for workshop in self.tables.index.workshop_names)
+        return touched
+
+    def affected_by(self, changed):
+        # Unassigned campers who want one of the changed (workshop, age class) pairs
+        affected = set()
+        for key in changed:
+            affected.update(camper_id for camper_id in self.wanted_by.get(key, []) if camper_id in self.scores)
+        return affected
+
+    def rescore(self, camper_ids):
+        evaluations = 0
+        for camper_id in camper_ids:
+            if camper_id not in self.scores:
+                continue
+            evaluations += 1
+            score = self.tables.remaining_values(camper_id)
+            if score != self.scores[camper_id]:
+                self.scores[camper_id] = score
+                heapq.heappush(self.heap, (score, self.order[camper_id], camper_id))
+        Metrics.count('csp.mrv_evaluations', evaluations)
+
+
+def lcv_scores(camper, schedule, workshops_permutations):
+    age_group = camper[1]['age_group']
+
+    # Score each (preference, slot) pair once instead of once per permutation
+    free_spaces = {}
+    for workshop in set(camper[1]['preferences']):
+        for slot in range(3):
+            spaces = schedule.get_remain_sit(workshop, slot, age_group)
+            free_spaces[workshop, slot] = spaces if spaces < schedule.max_slots_per_workshop else 0
+
+    return [free_spaces[perm[0], 0] + free_spaces[perm[1], 1] + free_spaces[perm[2], 2]
+            for perm in workshops_permutations]
+
+
+def book_permutation(camper, schedule, best_perm):
     for slot in range(len(best_perm)):
         if schedule.can_assign(camper[0], best_perm[slot], slot, camper[1]['age_group']):
             schedule.add_booking(camper[0], best_perm[slot], slot, camper[1]['age_group'])
@@ -90,6 +227,66 @@ def assign_by_LCV(camper, schedule):
         schedule.add_to_schedule(camper[0], best_perm[slot], slot)
 
 
+def unbook(camper, schedule):
+    for workshop, slot in schedule.schedule[camper[0]]:
+        if workshop != "-":
+            schedule.remove_booking(camper[0], workshop, slot, camper[1]['age_group'])
+    schedule.set_camper_sessions(camper[0], [])
+
+
+def assign_by_LCV(camper, schedule, workshops_permutations):
+    best_perm = None
+    lcv_score = 0
+    for perm, score in zip(workshops_permutations, lcv_scores(camper, schedule, workshops_permutations)):
+        if score >= lcv_score:
+            lcv_score = score
+            best_perm = perm
+    book_permutation(camper, schedule, best_perm)
+
+
+def assign_with_propagation(camper, schedule, tables, mrv_queue, max_backtracks):
+    # Forward checking on top of MRV + LCV: candidates that can be booked in full come first, each booking is
+    # propagated to the domains of the unassigned campers right away, and a booking that wipes out the last full
+    # schedule of another camper is undone and the next candidate tried, at most max_backtracks times.
+    # If every candidate wipes someone out, the one that wipes out the fewest campers is kept.
+    camper_id = camper[0]
+    workshops_permutations = tables.permutation_tables[tables.preferences[camper_id]]
+    scores = lcv_scores(camper, schedule, workshops_permutations)
+    candidates = sorted(range(len(workshops_permutations)), reverse=True,
+                        key=lambda i: (tables.feasible_slots(camper_id, workshops_permutations[i]), scores[i], i))
+
+    fewest_wipe_outs = None
+    for perm in [workshops_permutations[i] for i in candidates[:max_backtracks + 1]]:
+        feasible_before = dict(tables.feasible)
+        sessions_per_slot = schedule.count_sessions_per_slot()
+        book_permutation(camper, schedule, perm)
+        touched = mrv_queue.touched_sessions(camper_id, sessions_per_slot)
+        affected = mrv_queue.affected_by(tables.refresh(touched))
+
+        wipe_outs = 0
+        for other_id in affected:
+            age_class = tables.age_classes[other_id]
+            if tables.full_domain_size(other_id, feasible_before[age_class]) and \
+                    not tables.full_domain_size(other_id, tables.feasible[age_class]):
+                wipe_outs += 1
+                if fewest_wipe_outs is not None and wipe_outs >= fewest_wipe_outs[0]:
+                    break
+        if not wipe_outs:
+            mrv_queue.rescore(affected)
+            return 0
+
+        if fewest_wipe_outs is None or wipe_outs < fewest_wipe_outs[0]:
+            fewest_wipe_outs = (wipe_outs, perm)
+        # Backtrack
+        unbook(camper, schedule)
+        tables.refresh(touched)
+
+    sessions_per_slot = schedule.count_sessions_per_slot()
+    book_permutation(camper, schedule, fewest_wipe_outs[1])
+    mrv_queue.booked(camper_id, sessions_per_slot)
+    return fewest_wipe_outs[0]
+
+
 # def find_available_workshop(schedule, camper_id, slot, age_group):
 #     for workshop in schedule.session_bookings.items():
 #         curr_workshop = workshop[1][slot][age_group]
@@ -98,14 +295,22 @@ def assign_by_LCV(camper, schedule):
 #             return True
 #     return False
 
-def csp_solve(campers_data):
-    schedule = Schedule(campers_data)
-    lst_campers_pref = copy.deepcopy(campers_data['campers'])
-    while lst_campers_pref:
-        camper = select_unassigned_student(lst_campers_pref, schedule)  # MRV
-        assign_by_LCV(camper, schedule)
-        # remove camper from data
-        lst_campers_pref.pop(camper[0])
+def csp_solve(campers_data, schedule_cls=Schedule, propagate=False, max_backtracks=3):
+    schedule = schedule_cls(campers_data)
+    tables = CSPTables(campers_data['campers'], schedule)
+    mrv_queue = MRVQueue(campers_data['campers'], schedule, tables)
+    wipe_outs = 0
+    while mrv_queue:
+        camper = mrv_queue.pop()  # MRV
+        if propagate:
+            wipe_outs += assign_with_propagation(camper, schedule, tables, mrv_queue, max_backtracks)
+            continue
+        sessions_per_slot = schedule.count_sessions_per_slot()
+        assign_by_LCV(camper, schedule, tables.permutation_tables[tables.preferences[camper[0]]])
+        mrv_queue.booked(camper[0], sessions_per_slot)
+
+    if propagate:
+        print(f"Propagation: {wipe_outs} unavoidable domain wipe-outs")
 
     # eliminate too small workshops
     # for workshop in schedule.session_bookings.items():
@@ -0,0 +1,153 @@
+import os
+
+import numpy as np
+
+
+NAME_COLUMN = 'Camper\'s name'
+AGE_COLUMN = 'Age Unit'
+SELECTION_COLUMNS = ['Selection #1', 'Selection #2', 'Selection #3', 'Selection #4']
+SHEET_NAME = 'Sheet1'  # Every reader of a camper workbook shares this sheet, and with it the sidecar cache
+CACHE_SUFFIX = '.npz'
+MISSING = -1  # Code of an empty cell
+STREAM_FORMATS = ('.csv', '.jsonl', '.ndjson')
+CHUNK_SIZE = 10000  # Campers parsed per chunk when streaming
+
+
+class CampData:
+    # Integer-encoded camper sheet: one row per camper, names kept once in lookup tables
+    #   names      - camper names
+    #   age_codes  - index into age_units per camper
+    #   selections - campers x 4 matrix of indices into workshops (MISSING for empty cells)
+    def __init__(self, names, age_codes, age_units, selections, workshops):
+        # An empty age cell is coded -1, which would index the last age unit
+        missing = np.flatnonzero(age_codes == MISSING)
+        if missing.size:
+            raise ValueError(f"{missing.size} campers have no {AGE_COLUMN}, the first one is {names[missing[0]]}")
+        self.names = names
+        self.age_codes = age_codes
+        self.age_units = age_units
+        self.selections = selections
+        self.workshops = workshops
+
+    @classmethod
+    def from_frame(cls, sheet_data):
+        # Encode whole columns at once; codes follow first appearance, row by row, like the row loop did
+        import pandas as pd
+
+        age_codes, age_units = pd.factorize(sheet_data[AGE_COLUMN])
+        selection_codes, workshops = pd.factorize(sheet_data[SELECTION_COLUMNS].to_numpy().ravel())
+        return cls(sheet_data[NAME_COLUMN].to_numpy().astype(str), age_codes.astype(np.int32),
+                   np.asarray(age_units).astype(str),
+                   selection_codes.astype(np.int32).reshape(-1, len(SELECTION_COLUMNS)),
+                   np.asarray(workshops).astype(str))
+
+    def __len__(self):
+        return len(self.names)
+
+    def sample(self, samples):
+        # Row indices of a random sample taken in memory (every row, shuffled, when samples is negative)
+        permutation = np.random.permutation(len(self))
+        return permutation if samples < 0 else permutation[:samples]
+
+    def preferences(self, rows):
+        workshops = self.workshops.tolist()
+        return [[workshops[code] if code != MISSING else np.nan for code in codes]
+                for codes in self.selections[rows].tolist()]
+
+    def configuration(self, rows):
+        # {'campers': {...}, 'workshops': {...}} for the given rows, as main.py consumes it
+        configuration = {'campers': {}, 'workshops': {}}
+        age_units = self.age_units.tolist()
+        for camper_name, age_code, preferences in zip(self.names[rows].tolist(), self.age_codes[rows].tolist(),
+                                                      self.preferences(rows)):
+            configuration['campers'][camper_name] = {
+                'age_group': age_units[age_code],
+                'preferences': preferences
+            }
+            for preference in preferences:
+                if preference and preference not in configuration['workshops']:
+                    configuration['workshops'][preference] = {'name': preference, 'age_group': None}
+        return configuration
+
+
+def cache_key(file_path):
+    stat = os.stat(file_path)
+    return np.array([os.path.abspath(file_path)]), np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def load_camp_data(file_path, sheet_name=SHEET_NAME):
+    # Parse the sheet once and keep the encoded arrays in a <file>.npz sidecar, valid while the file's path,
+    # size and modification time are unchanged
+    cache_path = file_path + CACHE_SUFFIX
+    source, stamp = cache_key(file_path)
+    if os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as cache:
+                if cache['source'][0] == source[0] and np.array_equal(cache['stamp'], stamp) and \
+                        cache['sheet'][0] == str(sheet_name):
+                    return CampData(cache['names'], cache['age_codes'], cache['age_units'], cache['selections'],
+                                    cache['workshops'])
+        except (OSError, ValueError, KeyError):
+            pass  # Unreadable or outdated cache format, parse the sheet again
+
+    # pandas is only imported when a sheet actually has to be parsed, a cache hit runs without it
+    import pandas as pd
+
+    camp_data = CampData.from_frame(pd.read_excel(file_path, sheet_name=sheet_name,
+                                                  usecols=[NAME_COLUMN, AGE_COLUMN] + SELECTION_COLUMNS))
+    try:
+        temporary_path = cache_path + '.tmp'
+        with open(temporary_path, 'wb') as cache_file:
+            np.savez(cache_file, source=source, stamp=stamp, sheet=np.array([str(sheet_name)]),
+                     names=camp_data.names, age_codes=camp_data.age_codes, age_units=camp_data.age_units,
+                     selections=camp_data.selections, workshops=camp_data.workshops)
+        os.replace(temporary_path, cache_path)
+    except OSError:
+        pass  # Read-only data directory, run without the cache
+    return camp_data
+
+
+def is_stream_file(file_path):
+    return file_path.lower().endswith(STREAM_FORMATS)
+
+
+def read_camper_chunks(file_path, chunk_size=CHUNK_SIZE):
+    # Stream a CSV or JSON-lines camper export (same columns as the Excel sheet) as chunk configurations of at most
+    # chunk_size campers, so only one chunk of rows is held in memory at a time
+    import pandas as pd
+
+    columns = [NAME_COLUMN, AGE_COLUMN] + SELECTION_COLUMNS
+    if file_path.lower().endswith('.csv'):
+        frames = pd.read_csv(file_path, usecols=columns, dtype=str, chunksize=chunk_size)
+    else:
+        frames = pd.read_json(file_path, lines=True, dtype=False, chunksize=chunk_size)
+    with frames:
+        for frame in frames:
+            yield CampData.from_frame(frame[columns]).configuration(slice(None))
+
+
+def load_configuration_from_stream(file_path, samples, chunk_size=CHUNK_SIZE):
+    # Build a configuration from a streamed file. With samples >= 0 only a uniform random sample of that many campers
+    # is kept while streaming (reservoir sampling), otherwise every camper is kept. Either way the campers are
+    # shuffled, as CampData.sample shuffles an Excel sheet. Returns the configuration and the number of campers read.
+    reservoir = []
+    seen = 0
+    for chunk in read_camper_chunks(file_path, chunk_size):
+        for camper in chunk['campers'].items():
+            if samples < 0 or len(reservoir) < samples:
+                reservoir.append(camper)
+            else:
+                replaced = np.random.randint(seen + 1)
+                if replaced < samples:
+                    reservoir[replaced] = camper
+            seen += 1
+
+    reservoir = [reservoir[row] for row in np.random.permutation(len(reservoir))]
+
+    configuration = {'campers': {}, 'workshops': {}}
+    for camper_name, camper in reservoir:
+        configuration['campers'][camper_name] = camper
+        for preference in camper['preferences']:
+            if preference and preference not in configuration['workshops']:
+                configuration['workshops'][preference] = {'name': preference, 'age_group': None}
+    return configuration, seen
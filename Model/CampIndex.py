@@ -0,0 +1,135 @@
+import hashlib
+from itertools import islice
+
+
+FINGERPRINT_MASK = (1 << 64) - 1
+EMPTY = -1  # Workshop id of an unassigned slot
+AGE_GROUP_KEYS = ('young', 'old')  # Session side of each age bucket
+YOUNG_GROUP = frozenset({'Nanobyte', 'Kilobyte'})  # Age groups of the 'young' sessions
+OLDER_GROUP = frozenset({'Megabyte', 'Gigabyte'})  # Age groups of the 'old' sessions
+
+
+def age_bucket(age_group):
+    # 0 for the young sessions, 1 for the old ones, as Schedule splits session_bookings
+    return 0 if age_group in YOUNG_GROUP else 1
+
+
+def stable_key(value):
+    # 64-bit odd key derived from the value itself, so it is the same in every process and index rebuild
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') | 1
+
+
+class CampIndex:
+    # Dense integer ids for the campers and workshops of a configuration, shared by every schedule built from it
+    def __init__(self, configuration):
+        self.camper_names = []
+        self.camper_ids = {}
+        self.camper_age_groups = []
+        self.camper_age_buckets = []  # age_bucket per camper
+        self.workshop_names = []
+        self.workshop_ids = {}
+        self.camper_preferences = []
+        self.camper_preference_bits = []  # Bit workshop id set for every preferred workshop
+        self.interested = {}  # (workshop id, age bucket) -> names of the campers who prefer that workshop
+
+        # Zobrist-style keys used to fingerprint schedules incrementally
+        self.camper_keys = []
+        self.session_keys = [[] for _ in range(3)]
+        self.extend(configuration)
+
+    def extend(self, configuration):
+        # Index the workshops and campers added to the configuration since the last call; existing ids never change
+        for workshop in islice(configuration['workshops'], self.num_workshops, None):
+            self.workshop_ids[workshop] = len(self.workshop_names)
+            self.workshop_names.append(workshop)
+            for slot in range(3):
+                self.session_keys[slot].append(stable_key((workshop, slot)))
+
+        for camper_id, camper in islice(configuration['campers'].items(), self.num_campers, None):
+            self.camper_ids[camper_id] = len(self.camper_names)
+            self.camper_names.append(camper_id)
+            self.camper_age_groups.append(camper['age_group'])
+            self.camper_age_buckets.append(age_bucket(camper['age_group']))
+            self.camper_preferences.append(frozenset(
+                self.workshop_ids[workshop] for workshop in camper['preferences'] if workshop in self.workshop_ids))
+            self.camper_preference_bits.append(sum(1 << workshop for workshop in self.camper_preferences[-1]))
+            self.camper_keys.append(stable_key(camper_id))
+            self.add_interest(len(self.camper_names) - 1)
+
+    def remove_camper(self, camper_id):
+        # Drop a camper just removed from the configuration: later campers move up one id, as a rebuild would number
+        # them, without hashing every camper again
+        self.drop_interest(self.camper_ids[camper_id])
+        camper = self.camper_ids.pop(camper_id)
+        for values in (self.camper_names, self.camper_age_groups, self.camper_age_buckets, self.camper_preferences,
+                       self.camper_preference_bits, self.camper_keys):
+            del values[camper]
+        for position in range(camper, self.num_campers):
+            self.camper_ids[self.camper_names[position]] = position
+
+    def set_preferences(self, camper_id, preferences):
+        camper = self.camper_ids[camper_id]
+        self.drop_interest(camper)
+        self.camper_preferences[camper] = frozenset(
+            self.workshop_ids[workshop] for workshop in preferences if workshop in self.workshop_ids)
+        self.camper_preference_bits[camper] = sum(1 << workshop for workshop in self.camper_preferences[camper])
+        self.add_interest(camper)
+
+    def add_interest(self, camper):
+        bucket = self.camper_age_buckets[camper]
+        for workshop in self.camper_preferences[camper]:
+            self.interested.setdefault((workshop, bucket), set()).add(self.camper_names[camper])
+
+    def drop_interest(self, camper):
+        bucket = self.camper_age_buckets[camper]
+        for workshop in self.camper_preferences[camper]:
+            self.interested[workshop, bucket].discard(self.camper_names[camper])
+
+    def interested_campers(self, workshop, age_group_key):
+        # Names of the campers of one age group who prefer a workshop, in no particular order
+        return self.interested.get((self.workshop_ids[workshop], AGE_GROUP_KEYS.index(age_group_key)), ())
+
+    def copy(self):
+        # An index of its own for a copied configuration, which can then change without touching this one
+        clone = CampIndex.__new__(CampIndex)
+        for name, value in self.__dict__.items():
+            setattr(clone, name, value.copy())
+        clone.session_keys = [list(keys) for keys in self.session_keys]
+        clone.interested = {key: set(names) for key, names in self.interested.items()}
+        return clone
+
+    def age_group_key(self, camper_id):
+        # 'young' / 'old' session side of a camper, by name
+        return AGE_GROUP_KEYS[self.camper_age_buckets[self.camper_ids[camper_id]]]
+
+    def workshop_name(self, workshop):
+        # Reverse lookup for output; EMPTY maps to the '-' placeholder
+        return self.workshop_names[workshop] if workshop != EMPTY else "-"
+
+    def session_hash(self, camper, slot, workshop):
+        # Fingerprint contribution of camper (id) attending workshop (id) in slot
+        return (self.camper_keys[camper] * self.session_keys[slot][workshop]) & FINGERPRINT_MASK
+
+    @property
+    def num_campers(self):
+        return len(self.camper_names)
+
+    @property
+    def num_workshops(self):
+        return len(self.workshop_names)
+
+
+def get_index(configuration):
+    # Build the index once per configuration, extend it when campers or workshops were appended since (streamed
+    # input) and rebuild it if any were removed
+    index = configuration.get('index')
+    campers, workshops = configuration['campers'], configuration['workshops']
+    if index is not None and len(index.camper_names) == len(campers) and len(index.workshop_names) == len(workshops):
+        return index  # Up to date, the common case: this runs on every schedule update
+    if index is None or index.num_campers > len(campers) or index.num_workshops > len(workshops):
+        index = CampIndex(configuration)
+        configuration['index'] = index
+    else:
+        index.extend(configuration)
+    return index
@@ -0,0 +1,315 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+from Model.CampIndex import AGE_GROUP_KEYS, EMPTY, FINGERPRINT_MASK, OLDER_GROUP, YOUNG_GROUP, age_bucket, get_index
+from Model.Schedule import Schedule
+
+
+CAMPER_ARRAYS = ('scheduled', 'slot_flags', 'slots_filled', 'camper_satisfaction')  # Indexed by camper id
+
+
+class ScheduleView(Mapping):
+    # Read-only {camper: [(workshop, slot), ...]} view over the assignment matrix
+    def __init__(self, compact_schedule):
+        self.compact_schedule = compact_schedule
+
+    def __getitem__(self, camper_id):
+        index = self.compact_schedule.index
+        camper = index.camper_ids[camper_id]
+        if not self.compact_schedule.scheduled[camper]:
+            raise KeyError(camper_id)
+        return [(index.workshop_name(workshop), slot)
+                for slot, workshop in enumerate(self.compact_schedule.assignments[camper].tolist())]
+
+    def __iter__(self):
+        camper_names = self.compact_schedule.index.camper_names
+        for camper in np.flatnonzero(self.compact_schedule.scheduled).tolist():
+            yield camper_names[camper]
+
+    def __len__(self):
+        return int(np.count_nonzero(self.compact_schedule.scheduled))
+
+
+class CompactSchedule(Schedule):
+    # Same API as Schedule, backed by dense integer arrays instead of nested dicts of camper names:
+    #   assignments - campers x slots matrix of workshop ids (EMPTY when unassigned)
+    #   occupancy   - workshops x slots x age groups matrix of booked seats
+    def __init__(self, configuration):
+        self.configuration = configuration
+        self.index = get_index(configuration)
+        self.assignments = np.full((self.index.num_campers, 3), EMPTY, dtype=np.int16)
+        self.occupancy = np.zeros((self.index.num_workshops, 3, 2), dtype=np.int16)
+        self.scheduled = np.zeros(self.index.num_campers, dtype=bool)  # Campers that have a schedule entry
+        self.slot_flags = np.zeros(self.index.num_campers, dtype=np.uint8)  # Bit per slot, as camper_slots
+        self.max_slots_per_workshop = 15  # Max capacity of each session
+        self.min_slots_per_workshop = 5   # Minimum number of campers required to hold a session
+        self.max_sessions_per_slot = 35   # Maximum number of sessions per slot
+        self.sessions_per_slot = [0, 0, 0]  # Live count of open sessions per slot, kept in sync with occupancy
+        self.fingerprint = 0  # XOR of session_hash over every assigned (camper, workshop, slot)
+        # Running fitness totals, updated on every write to the assignment matrix
+        self.slots_filled = np.zeros(self.index.num_campers, dtype=np.int8)
+        self.camper_satisfaction = np.zeros(self.index.num_campers, dtype=np.int8)
+        self.fully_scheduled = 0  # Campers with all 3 slots filled
+        self.satisfaction_score = 0  # Sum of camper_satisfaction
+        self._session_bookings = None  # Name lists materialized on demand for reporting
+        self.owns_configuration = False  # Set once a late change has copied the configuration for this schedule
+
+    @property
+    def schedule(self):
+        return ScheduleView(self)
+
+    @property
+    def session_bookings(self):
+        # {workshop: {slot: {'young': [...], 'old': [...]}}} built from the assignment matrix, cached until the next change
+        if self._session_bookings is None:
+            index = self.index
+            session_bookings = {
+                workshop: {slot: {'young': [], 'old': []} for slot in range(3)}
+                for workshop in index.workshop_names
+            }
+            for camper in np.flatnonzero(self.scheduled).tolist():
+                age_group_key = AGE_GROUP_KEYS[index.camper_age_buckets[camper]]
+                for slot, workshop in enumerate(self.assignments[camper].tolist()):
+                    if workshop != EMPTY:
+                        session_bookings[index.workshop_names[workshop]][slot][age_group_key].append(
+                            index.camper_names[camper])
+            self._session_bookings = session_bookings
+        return self._session_bookings
+
+    def is_compatible_age_group(self, workshop, slot, camper_age_group):
+        young, old = self.occupancy[self.index.workshop_ids[workshop], slot].tolist()
+        if not young and not old:
+            return True  # If both sub-sessions are empty, any age group can start here
+        if camper_age_group in YOUNG_GROUP and young:
+            return True
+        if camper_age_group in OLDER_GROUP and old:
+            return True
+        return False
+
+    def rejection_reason(self, camper_id, workshop, slot, camper_age_group):
+        camper = self.index.camper_ids[camper_id]
+        workshop_id = self.index.workshop_ids[workshop]
+        booked = self.occupancy[workshop_id, slot, self.index.camper_age_buckets[camper]]
+
+        # Same checks, in the same order, as Schedule.rejection_reason
+        if self.scheduled[camper] and workshop_id in self.assignments[camper]:
+            return 'repeated_workshop'
+        if booked >= self.max_slots_per_workshop:
+            return 'session_full'
+        if self.slot_flags[camper] & (1 << slot):
+            return 'slot_taken'
+        if not self.is_compatible_age_group(workshop, slot, camper_age_group):
+            return 'age_group'
+        if not booked and not self.can_start_new_session_in_slot(slot):
+            return 'slot_full'
+        return None
+
+    def get_remain_sit(self, workshop, slot, age_group):
+        booked = self.occupancy[self.index.workshop_ids[workshop], slot, age_bucket(age_group)]
+        return self.max_slots_per_workshop - int(booked)
+
+    def add_booking(self, camper_id, workshop, slot, camper_age_group):
+        # The seat and the assignment matrix entry are written together, as remove_booking clears both
+        camper = self.index.camper_ids[camper_id]
+        self.join_session(camper_id, workshop, slot, AGE_GROUP_KEYS[self.index.camper_age_buckets[camper]])
+        self.assign(camper, slot, self.workshop_id(workshop))
+        self.slot_flags[camper] |= 1 << slot
+
+    def join_session(self, camper_id, workshop, slot, age_group_key):
+        seats = self.occupancy[self.index.workshop_ids[workshop], slot]
+        if not seats.any():
+            self.sessions_per_slot[slot] += 1
+        seats[AGE_GROUP_KEYS.index(age_group_key)] += 1
+        self._session_bookings = None
+
+    def is_booked(self, camper_id, workshop, slot, age_group_key):
+        return self.assignments[self.index.camper_ids[camper_id], slot] == self.index.workshop_ids[workshop]
+
+    def session_campers(self, workshop, slot, age_group_key):
+        index = self.index
+        bucket = AGE_GROUP_KEYS.index(age_group_key)
+        members = np.flatnonzero(self.assignments[:, slot] == index.workshop_ids[workshop]).tolist()
+        return [index.camper_names[camper] for camper in members if index.camper_age_buckets[camper] == bucket]
+
+    def remove_booking(self, camper_id, workshop, slot, camper_age_group):
+        camper = self.index.camper_ids[camper_id]
+        workshop_id = self.index.workshop_ids[workshop]
+        if self.assignments[camper, slot] != workshop_id:
+            return
+
+        seats = self.occupancy[workshop_id, slot]
+        seats[self.index.camper_age_buckets[camper]] -= 1
+        if not seats.any():
+            self.sessions_per_slot[slot] -= 1
+        self.assign(camper, slot, EMPTY)
+        self.slot_flags[camper] &= ~np.uint8(1 << slot)
+
+    def workshop_id(self, workshop):
+        return self.index.workshop_ids[workshop] if workshop != "-" else EMPTY
+
+    def assign(self, camper, slot, workshop):
+        # Single write path for the assignment matrix, keeping the fingerprint and fitness totals in sync
+        old_workshop = int(self.assignments[camper, slot])
+        preference_bits = self.index.camper_preference_bits[camper]
+        old_slots_filled = int(self.slots_filled[camper])
+        slots_filled = old_slots_filled
+        satisfied = 0
+        if old_workshop != EMPTY:
+            self.fingerprint ^= self.index.session_hash(camper, slot, old_workshop)
+            slots_filled -= 1
+            satisfied -= preference_bits >> old_workshop & 1
+        if workshop != EMPTY:
+            self.fingerprint ^= self.index.session_hash(camper, slot, workshop)
+            slots_filled += 1
+            satisfied += preference_bits >> workshop & 1
+
+        self.fully_scheduled += (slots_filled == 3) - (old_slots_filled == 3)
+        self.slots_filled[camper] = slots_filled
+        self.camper_satisfaction[camper] += satisfied
+        self.satisfaction_score += satisfied
+        self.assignments[camper, slot] = workshop
+        self._session_bookings = None
+
+    def set_camper_sessions(self, camper_id, sessions):
+        camper = self.index.camper_ids[camper_id]
+        workshops = [EMPTY, EMPTY, EMPTY]
+        for workshop, slot in sessions:
+            workshops[slot] = self.workshop_id(workshop)
+        for slot, workshop in enumerate(workshops):
+            self.assign(camper, slot, workshop)
+        self.scheduled[camper] = True
+
+    def set_session(self, camper_id, slot, workshop):
+        self.assign(self.index.camper_ids[camper_id], slot, self.workshop_id(workshop))
+
+    def add_to_schedule(self, camper_id, workshop, slot):
+        camper = self.index.camper_ids[camper_id]
+        self.assign(camper, slot, self.workshop_id(workshop))
+        self.scheduled[camper] = True
+
+    def forget_slots(self):
+        self.slot_flags = np.zeros_like(self.slot_flags)
+
+    def index_campers(self):
+        # Grow the arrays to the campers and workshops registered since they were allocated
+        self.index = get_index(self.configuration)
+        campers = self.index.num_campers - len(self.assignments)
+        if campers > 0:
+            self.assignments = np.concatenate([self.assignments, np.full((campers, 3), EMPTY, dtype=np.int16)])
+            for name in CAMPER_ARRAYS:
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate([array, np.zeros(campers, dtype=array.dtype)]))
+        workshops = self.index.num_workshops - len(self.occupancy)
+        if workshops > 0:
+            self.occupancy = np.concatenate([self.occupancy, np.zeros((workshops, 3, 2), dtype=np.int16)])
+
+    def forget_camper(self, camper_id):
+        # The camper's row goes, and the campers after it move up one id, as they do in the index
+        camper = self.index.camper_ids[camper_id]
+        self.assignments = np.delete(self.assignments, camper, axis=0)
+        for name in CAMPER_ARRAYS:
+            setattr(self, name, np.delete(getattr(self, name), camper))
+        self._session_bookings = None
+
+    @classmethod
+    def offspring(cls, configuration, parent1, parent2, crossover_points):
+        # Schedule.offspring on the arrays: each child's workshop ids are picked from the parents' assignment
+        # matrices in one step, then booked by rebuild()
+        positions = range(crossover_points[0], crossover_points[1] if len(crossover_points) == 2 else 3)
+        swapped = np.isin(np.arange(3), positions)
+        campers = np.flatnonzero(parent1.scheduled & parent2.scheduled)
+        children = []
+        for own, other in ((parent1, parent2), (parent2, parent1)):
+            child = cls(configuration)
+            child.rebuild(campers.tolist(), np.where(swapped, other.assignments, own.assignments)[campers].tolist())
+            children.append(child)
+        return tuple(children)
+
+    def rebuild(self, campers, rows):
+        # Book each camper's row of workshop ids into this empty schedule, campers in the given order, leaving EMPTY
+        # whatever ensure_valid_sessions would turn into '-'. The same checks run on plain ints and nested lists,
+        # with the arrays and totals written back once at the end.
+        index = self.index
+        occupancy = self.occupancy.tolist()
+        sessions_per_slot = self.sessions_per_slot
+        session_keys = index.session_keys
+        booked_rows, slots_filled, satisfaction = [], [], []
+        fingerprint = self.fingerprint
+        for camper, row in zip(campers, rows):
+            bucket = index.camper_age_buckets[camper]
+            age_group = index.camper_age_groups[camper]
+            side = 0 if age_group in YOUNG_GROUP else 1 if age_group in OLDER_GROUP else None  # is_compatible_age_group
+            camper_key = index.camper_keys[camper]
+            preference_bits = index.camper_preference_bits[camper]
+            booked = [EMPTY, EMPTY, EMPTY]
+            filled = satisfied = 0
+            for slot, workshop in enumerate(row):
+                if workshop == EMPTY or workshop in booked:
+                    continue
+                seats = occupancy[workshop][slot]
+                if seats[bucket] >= self.max_slots_per_workshop:
+                    continue
+                if seats[0] or seats[1]:
+                    if side is None or not seats[side]:
+                        continue
+                elif sessions_per_slot[slot] >= self.max_sessions_per_slot:
+                    continue
+                else:
+                    sessions_per_slot[slot] += 1
+                seats[bucket] += 1
+                booked[slot] = workshop
+                filled += 1
+                satisfied += preference_bits >> workshop & 1
+                fingerprint ^= (camper_key * session_keys[slot][workshop]) & FINGERPRINT_MASK
+            booked_rows.append(booked)
+            slots_filled.append(filled)
+            satisfaction.append(satisfied)
+
+        if campers:
+            self.assignments[campers] = booked_rows
+            self.scheduled[campers] = True
+            self.slots_filled[campers] = slots_filled
+            self.camper_satisfaction[campers] = satisfaction
+            self.occupancy = np.array(occupancy, dtype=np.int16).reshape(self.occupancy.shape)
+        self.fully_scheduled += slots_filled.count(3)
+        self.satisfaction_score += sum(satisfaction)
+        self.fingerprint = fingerprint
+        self._session_bookings = None
+
+    def differing_sessions(self, other, slots):
+        slots = list(slots)
+        own, theirs = self.assignments[:, slots], other.assignments[:, slots]
+        both_scheduled = (self.scheduled & other.scheduled)[:, None]
+        campers, columns = np.nonzero((own != theirs) & both_scheduled)
+
+        index = self.index
+        return [(index.camper_names[camper], slots[column], index.workshop_name(own[camper, column]),
+                 index.workshop_name(theirs[camper, column]))
+                for camper, column in zip(campers.tolist(), columns.tolist())]
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop('index', None)
+        state['_session_bookings'] = None
+        return state
+
+    def bind(self, configuration):
+        self.configuration = configuration
+        self.index = get_index(configuration)
+        self.owns_configuration = False
+        return self
+
+    def copy(self):
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone.assignments = self.assignments.copy()
+        clone.occupancy = self.occupancy.copy()
+        clone.scheduled = self.scheduled.copy()
+        clone.slot_flags = self.slot_flags.copy()
+        clone.slots_filled = self.slots_filled.copy()
+        clone.camper_satisfaction = self.camper_satisfaction.copy()
+        clone.sessions_per_slot = list(self.sessions_per_slot)
+        clone._session_bookings = None
+        self.owns_configuration = clone.owns_configuration = False
+        return clone
@@ -1,4 +1,4 @@
-import pandas as pd
+from Model.CampData import load_camp_data
 
 
 class Configuration:
@@ -53,14 +53,14 @@ class Configuration:
         self.sessions = {}
         self.age_units = {}
 
-        # Read Excel file
-        data = pd.read_excel(fileName)
+        # Read Excel file (or its cached encoding) as whole columns
+        data = load_camp_data(fileName)
+        age_units = data.age_units.tolist()
 
-        # Process each row in the DataFrame
-        for _, row in data.iterrows():
-            camper_name = row['Camper\'s name']
-            age_unit = row['Age Unit']
-            preferences = [row['Selection #1'], row['Selection #2'], row['Selection #3'], row['Selection #4']]
+        # Process each row of the encoded data
+        for camper_name, age_code, preferences in zip(data.names.tolist(), data.age_codes.tolist(),
+                                                      data.preferences(slice(None))):
+            age_unit = age_units[age_code]
 
             # Store campers
             self.campers[camper_name] = {
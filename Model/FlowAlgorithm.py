@@ -0,0 +1,301 @@
+from itertools import permutations
+from math import ceil
+
+from Model.CampIndex import get_index
+from Model.MinCostFlow import MinCostFlow
+from Model.Schedule import Schedule
+
+
+SCHEDULE_TYPE = 'Flow Algorithm'
+SOURCE, SINK = 0, 1
+
+
+def open_sessions(campers, schedule):
+    # Decide which (workshop, slot) sessions open and for which age group before the flow fills them.
+    # A session only ever hosts one age group (see Schedule.is_compatible_age_group), every workshop gets as many
+    # sessions per age group as its demand needs (at most one per slot), and each session goes to the slot that
+    # has the fewest seats for that age group so far, so campers can find a seat in every slot.
+    index = get_index(schedule.configuration)
+    demand = {}
+    for camper_id, camper in campers.items():
+        key = index.age_group_key(camper_id)
+        for workshop in dict.fromkeys(camper['preferences']):
+            if workshop != "-" and workshop in schedule.configuration['workshops']:
+                demand[workshop, key] = demand.get((workshop, key), 0) + 1
+
+    needed = {}
+    for (workshop, key), count in demand.items():
+        needed.setdefault(workshop, {})[key] = min(3, ceil(count / schedule.max_slots_per_workshop))
+    for workshop, sessions in needed.items():
+        # Three slots at most: take sessions away from the age group with the least demand per session
+        while sum(sessions.values()) > 3:
+            key = min(sessions, key=lambda k: demand[workshop, k] / sessions[k])
+            sessions[key] -= 1
+
+    sessions = {}
+    seats = {(slot, key): 0 for slot in range(3) for key in ('young', 'old')}
+    sessions_per_slot = [0, 0, 0]
+    popularity = sorted(needed, key=lambda w: -sum(demand.get((w, key), 0) for key in ('young', 'old')))
+    for workshop in popularity:
+        for key in sorted(needed[workshop], key=lambda k: -demand[workshop, k]):
+            for _ in range(needed[workshop][key]):
+                free = [slot for slot in range(3) if (workshop, slot) not in sessions and
+                        sessions_per_slot[slot] < schedule.max_sessions_per_slot]
+                if not free:
+                    break
+                slot = min(free, key=lambda s: seats[s, key])
+                sessions[workshop, slot] = key
+                seats[slot, key] += schedule.max_slots_per_workshop
+                sessions_per_slot[slot] += 1
+    return sessions
+
+
+class SessionNetwork:
+    # source -> (camper, slot) [1] -> (workshop, slot) session [max_slots_per_workshop] -> slot sink -> sink
+    # Every unit of flow seats a camper in a preferred workshop, so a maximum flow is a maximum number of satisfied
+    # preferences for the open sessions. Edge costs rotate the preference ranks per slot (slot 0 favours the first
+    # choice, slot 1 the second, ...) so the cheapest maximum flow spreads each camper's choices over the slots.
+    def __init__(self, campers, schedule, sessions):
+        self.campers = campers
+        self.sessions = sessions
+        self.network = MinCostFlow(2)
+        self.slot_edges = []
+        slot_sinks = []
+        for _ in range(3):
+            slot_sinks.append(self.network.add_node())
+            self.slot_edges.append(self.network.add_edge(
+                slot_sinks[-1], SINK, schedule.max_sessions_per_slot * schedule.max_slots_per_workshop))
+        self.session_nodes = {}
+        self.session_edges = {}
+        for (workshop, slot), key in sessions.items():
+            self.session_nodes[workshop, slot] = self.network.add_node()
+            self.session_edges[workshop, slot] = self.network.add_edge(
+                self.session_nodes[workshop, slot], slot_sinks[slot], schedule.max_slots_per_workshop)
+
+        self.camper_nodes = {}
+        self.source_edges = {}
+        self.seats = {}  # camper edge -> (camper, workshop, slot)
+        self.seat_edges = {}  # (camper, workshop, slot) -> camper edge
+        index = get_index(schedule.configuration)
+        for camper_id, camper in campers.items():
+            key = index.age_group_key(camper_id)
+            preferences = list(dict.fromkeys(camper['preferences']))
+            for slot in range(3):
+                self.camper_nodes[camper_id, slot] = self.network.add_node()
+                self.source_edges[camper_id, slot] = self.network.add_edge(SOURCE, self.camper_nodes[camper_id, slot], 1)
+                for rank, workshop in enumerate(preferences):
+                    if sessions.get((workshop, slot)) == key:
+                        edge = self.network.add_edge(self.camper_nodes[camper_id, slot],
+                                                     self.session_nodes[workshop, slot], 1,
+                                                     (rank - slot) % len(preferences))
+                        self.seats[edge] = (camper_id, workshop, slot)
+                        self.seat_edges[camper_id, workshop, slot] = edge
+
+        self.attending = {camper_id: {} for camper_id in campers}  # camper -> {slot: (workshop, camper edge)}
+
+    def solve(self):
+        flow, _ = self.network.solve(SOURCE, SINK)
+        for edge, (camper_id, workshop, slot) in self.seats.items():
+            if self.network.flow(edge):
+                self.attending[camper_id][slot] = (workshop, edge)
+        return flow
+
+    def assignment(self):
+        return {(camper_id, slot): workshop
+                for camper_id, slots in self.attending.items() for slot, (workshop, _) in slots.items()}
+
+    def unseat(self, camper_id, slot, forbid=False):
+        # Cancel the camper's unit of flow in this slot; forbid drops the seat from the network for good
+        workshop, edge = self.attending[camper_id].pop(slot)
+        self.network.push([self.source_edges[camper_id, slot], edge, self.session_edges[workshop, slot],
+                           self.slot_edges[slot]], -1)
+        if forbid:
+            self.network.capacity[edge] = 0
+
+    def repeats(self):
+        # Seats that repeat a workshop the camper already attends in an earlier slot
+        seats = []
+        for camper_id, slots in self.attending.items():
+            seen = set()
+            for slot in sorted(slots):
+                if slots[slot][0] in seen:
+                    seats.append((camper_id, slot))
+                seen.add(slots[slot][0])
+        return seats
+
+    def augment(self, camper_id, slot):
+        # Seat an unseated (camper, slot) through an augmenting path that may move other campers between sessions
+        # of the same slot, but never into a workshop they already attend in another slot
+        def allowed(edge):
+            if edge not in self.seats:
+                return True
+            other_id, workshop, other_slot = self.seats[edge]
+            return all(attended != workshop for s, (attended, _) in self.attending[other_id].items()
+                       if s != other_slot)
+
+        path = self.network.residual_path(self.camper_nodes[camper_id, slot], SINK, allowed, avoid=(SOURCE,))
+        if path is None:
+            return False
+
+        moves = {}
+        for edge in path:
+            if edge in self.seats:
+                other_id, workshop, other_slot = self.seats[edge]
+                moves[other_id, other_slot] = (workshop, edge)
+        # A path that moves the same camper in two slots is checked as a whole before it is applied
+        for other_id in {other_id for other_id, _ in moves}:
+            slots = dict(self.attending[other_id])
+            slots.update({s: move for (c, s), move in moves.items() if c == other_id})
+            workshops = [workshop for workshop, _ in slots.values()]
+            if len(workshops) != len(set(workshops)):
+                return False
+
+        self.network.push([self.source_edges[camper_id, slot]] + path)
+        for (other_id, other_slot), move in moves.items():
+            self.attending[other_id][other_slot] = move
+        return True
+
+    def rearrange(self):
+        # Seat campers left with an empty slot by reassigning their preferred workshops to the slots from scratch,
+        # which no augmenting path can do since each of a camper's slots is a node of its own. Returns the number
+        # of seats gained.
+        capacity = self.network.capacity
+        gained = 0
+        for camper_id, slots in self.attending.items():
+            if len(slots) == 3:
+                continue
+
+            def free(workshop, slot):
+                edge = self.seat_edges.get((camper_id, workshop, slot))
+                if edge is None:
+                    return False
+                if slots.get(slot, (None,))[0] == workshop:
+                    return True
+                return capacity[edge] > 0 and capacity[self.session_edges[workshop, slot]] > 0 and \
+                    capacity[self.slot_edges[slot]] + (slot in slots) > 0
+
+            preferences = list(dict.fromkeys(self.campers[camper_id]['preferences']))
+            if not any(free(workshop, slot) for workshop in preferences for slot in range(3)
+                       if slots.get(slot, (None,))[0] != workshop):
+                continue
+            best = None
+            for workshops in permutations(preferences + [None] * 3, 3):
+                seated = [(workshop, slot) for slot, workshop in enumerate(workshops) if workshop is not None]
+                if len(seated) > len(slots) and all(free(workshop, slot) for workshop, slot in seated) and \
+                        (best is None or len(seated) > len(best)):
+                    best = seated
+            if best is None:
+                continue
+            gained += len(best) - len(slots)
+            for slot in list(slots):
+                self.unseat(camper_id, slot)
+            for workshop, slot in best:
+                edge = self.seat_edges[camper_id, workshop, slot]
+                self.network.push([self.source_edges[camper_id, slot], edge, self.session_edges[workshop, slot],
+                                   self.slot_edges[slot]])
+                slots[slot] = (workshop, edge)
+        return gained
+
+    def fill(self):
+        # Augment from every unseated (camper, slot) until no augmenting path is left
+        seated = 0
+        progress = True
+        while progress:
+            progress = False
+            for camper_id, slot in self.camper_nodes:
+                if slot not in self.attending[camper_id] and self.augment(camper_id, slot):
+                    seated += 1
+                    progress = True
+        return seated
+
+
+def reopen(network, schedule):
+    # The next open set: a closed (workshop, slot) session opens while its slot has room for one. Otherwise it
+    # replaces the least attended open session of the slot (or the same workshop's session when that one is open
+    # to the other age group), if more campers with an empty slot want it than that session seats.
+    # None when nothing would change.
+    index = get_index(schedule.configuration)
+    attendance = {session: 0 for session in network.sessions}
+    for (camper_id, slot), workshop in network.assignment().items():
+        attendance[workshop, slot] += 1
+
+    votes = {}
+    for camper_id, slots in network.attending.items():
+        key = index.age_group_key(camper_id)
+        attended = {workshop for workshop, _ in slots.values()}
+        for workshop in dict.fromkeys(network.campers[camper_id]['preferences']):
+            if workshop == "-" or workshop in attended or workshop not in schedule.configuration['workshops']:
+                continue
+            for slot in range(3):
+                if slot not in slots and network.sessions.get((workshop, slot)) != key:
+                    votes[workshop, slot, key] = votes.get((workshop, slot, key), 0) + 1
+
+    sessions = dict(network.sessions)
+    changed = False
+    for workshop, slot, key in sorted(votes, key=lambda session: -votes[session]):
+        if (workshop, slot) in sessions:
+            replaced = (workshop, slot)  # Open to the other age group
+        elif sum(1 for _, s in sessions if s == slot) < schedule.max_sessions_per_slot:
+            replaced = None
+        else:
+            replaced = min((session for session in sessions if session[1] == slot), key=attendance.__getitem__)
+        if replaced is not None:
+            if attendance[replaced] >= votes[workshop, slot, key]:
+                continue
+            del sessions[replaced]
+        sessions[workshop, slot] = key
+        attendance[workshop, slot] = votes[workshop, slot, key]  # Counted as seated from here on
+        changed = True
+    return sessions if changed else None
+
+
+def seat(campers, schedule, sessions):
+    # Maximum flow over the open sessions. The flow cannot express "each workshop at most once per camper", so the
+    # seats that repeat a workshop are dropped and the freed campers re-seated, through constrained augmenting paths
+    # and by rearranging their own workshops between the slots
+    network = SessionNetwork(campers, schedule, sessions)
+    upper_bound = network.solve()
+    for camper_id, slot in network.repeats():
+        network.unseat(camper_id, slot, forbid=True)
+    while network.fill() + network.rearrange():
+        pass
+    return network, upper_bound
+
+
+def flow_solve(campers_data, schedule_cls=Schedule, rounds=10):
+    # A heuristic. Opening a session is a yes/no decision that a flow cannot make, so the open set is first guessed
+    # from demand, then revised from where the flow left campers without a seat, for as long as that seats more
+    # campers (up to rounds times). Within an open set the flow seats as many preferences as possible when a camper
+    # may repeat a workshop; the repeats are then repaired locally, which can fall short of that bound.
+    schedule = schedule_cls(campers_data)
+    campers = campers_data['campers']
+    sessions = open_sessions(campers, schedule)
+    best = None
+    for _ in range(rounds):
+        network, upper_bound = seat(campers, schedule, dict(sessions))
+        seated = len(network.assignment())
+        if best is not None and seated <= len(best[0].assignment()):
+            break
+        best = network, upper_bound
+        # Stop once every camper or every seat the camp can hold is taken
+        seats = 3 * schedule.max_sessions_per_slot * schedule.max_slots_per_workshop
+        sessions = reopen(network, schedule) if seated < min(3 * len(campers), seats) else None
+        if sessions is None:
+            break
+    network, upper_bound = best
+
+    # Book through the regular Schedule API; anything still violating a constraint becomes '-'
+    assignment = network.assignment()
+    for camper_id, camper in campers.items():
+        for slot in range(3):
+            workshop = assignment.get((camper_id, slot), "-")
+            if workshop != "-" and schedule.can_assign(camper_id, workshop, slot, camper['age_group']):
+                schedule.add_booking(camper_id, workshop, slot, camper['age_group'])
+            else:
+                workshop = "-"
+            schedule.add_to_schedule(camper_id, workshop, slot)
+
+    held = {(workshop, slot) for (_, slot), workshop in assignment.items()}
+    print(f"Flow: {len(assignment)} preferred seats in {len(held)} sessions "
+          f"(at most {upper_bound} with repeated workshops allowed)")
+    return schedule, SCHEDULE_TYPE
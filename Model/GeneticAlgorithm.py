@@ -1,55 +1,251 @@
+import hashlib
+import os
+import pickle
 import random
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
+from Model import LocalSearch, Metrics
+from Model.CampIndex import get_index
 from Model.Schedule import Schedule
 
 
+# Breeding state of a pool worker, set up once per process by init_worker
+worker_ga = None
+CHECKPOINT_VERSION = 2  # Bumped whenever the pickled schedule state changes
+
+
+def init_worker(configuration, schedule_cls, crossover_rate, mutation_rate, crossover_mode, metrics_enabled=False):
+    # The configuration is shipped once per worker here rather than with every task
+    global worker_ga
+    if metrics_enabled:
+        Metrics.enable()
+        Metrics.drain()  # Forked workers start with a copy of the parent's counts, which the parent already has
+    worker_ga = GeneticAlgorithm(configuration, crossover_rate=crossover_rate, mutation_rate=mutation_rate,
+                                 schedule_cls=schedule_cls, crossover_mode=crossover_mode, population=[])
+
+
+def breed_chunk(pairs, seeds):
+    for parent1, parent2 in pairs:
+        parent1.bind(worker_ga.configuration)
+        parent2.bind(worker_ga.configuration)
+    children = worker_ga.breed(pairs, seeds)
+    return children, worker_ga.fitness_population(children), Metrics.drain()
+
+
+def checkpoint_run_seed(checkpoint):
+    # run_seed saved in a checkpoint, None when there is no readable checkpoint or it was saved without one
+    try:
+        with open(checkpoint, 'rb') as file:
+            return pickle.load(file).get('run_seed')
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+
+
 class GeneticAlgorithm:
-    def __init__(self, configuration, population_size=100, generations=1500, crossover_rate=0.8, mutation_rate=0.2):
+    def __init__(self, configuration, population_size=100, generations=1500, crossover_rate=0.8, mutation_rate=0.2,
+                 schedule_cls=Schedule, fitness_cache_size=1000, workers=1, seed=None, population=None,
+                 crossover_mode='rebuild', warm_start=0.0, perturbation=0.05, local_search=0.0, elite_size=2,
+                 checkpoint=None, checkpoint_interval=0, resume=False, run_seed=None):
+        if seed is not None:
+            random.seed(seed)
         self.configuration = configuration
+        self.schedule_cls = schedule_cls  # Schedule or CompactSchedule
         self.population_size = population_size
         self.generations = generations
         self.crossover_rate = crossover_rate
         self.mutation_rate = mutation_rate
-        self.population = self.initialize_population()
+        self.crossover_mode = crossover_mode  # 'rebuild' children from scratch or apply 'delta' genes to parent copies
+        self.fitness_cache = OrderedDict()  # Schedule fingerprint -> fitness, least recently used first
+        self.fitness_cache_size = fitness_cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.workers = workers  # Above 1, offspring are bred from a seed per pair, by up to that many processes
+        self.processes = 0  # Pool processes of the current run, 0 when the seeded pairs are bred in-process
+        self.warm_start = warm_start  # Fraction of the initial population seeded from FIFO and CSP schedules
+        self.perturbation = perturbation  # Fraction of the campers moved in each seeded schedule
+        self.local_search = local_search  # Seconds of local search on the elite per generation (0 turns it off)
+        self.elite_size = elite_size  # Best individuals improved by the local search
+        self.checkpoint = checkpoint  # File the run is saved to every checkpoint_interval generations (0 never)
+        self.checkpoint_interval = checkpoint_interval
+        self.run_seed = run_seed  # Seed the caller drew the campers with, saved so a resume can draw the same ones
         self.best_schedule = None
+        self.resume_state = self.read_checkpoint() if resume else None  # Loop state restored by evolve()
+        if self.resume_state is not None:
+            self.population = self.resume_state.pop('population')
+            self.best_schedule = self.resume_state.pop('best_schedule')
+        else:
+            self.population = population if population is not None else self.initialize_population()
 
     def initialize_population(self):
         print("Initializing population with diverse strategies...")
-        population = []
+        population = self.seeded_population(round(self.warm_start * self.population_size))
 
-        for i in range(self.population_size):
-            schedule = Schedule(self.configuration)
+        for i in range(self.population_size - len(population)):
+            schedule = self.schedule_cls(self.configuration)
             schedule.assign_with_random_sessions()  # Pure random assignments
             population.append(schedule)
 
         print(f"Initialized diverse population with {self.population_size} schedules.")
         return population
 
+    def seeded_population(self, size):
+        # The FIFO and CSP schedules as they are, then perturbed copies of them taking turns
+        if size == 0:
+            return []
+        # Imported here: the CSP module imports this one
+        from Model.BaselineAlgorithm import FIFOSchedule
+        from Model.CSPAlgorithm import csp_solve
+
+        sources = [self.adopt(FIFOSchedule(self.configuration)), self.adopt(csp_solve(self.configuration)[0])]
+        population = sources[:size]
+        while len(population) < size:
+            individual = sources[len(population) % 2].copy()
+            self.perturb(individual)
+            population.append(individual)
+        print(f"Seeded {size} schedules from the FIFO and CSP models.")
+        return population
+
+    def adopt(self, source):
+        # Rebuild another model's schedule as an individual of this GA
+        return self.schedule_cls.from_schedule(source)
+
+    def perturb(self, individual):
+        # Move a random perturbation fraction of the campers to another preferred workshop in one random slot, or
+        # leave that slot empty when none fits, so seeded individuals differ from their source and from each other
+        campers = self.configuration['campers']
+        camper_names = get_index(self.configuration).camper_names
+        for camper_id in random.sample(camper_names, round(self.perturbation * len(camper_names))):
+            camper_age_group = campers[camper_id]['age_group']
+            slot = random.randrange(3)
+            current_workshop = individual.schedule[camper_id][slot][0]
+            if current_workshop != "-":
+                individual.remove_booking(camper_id, current_workshop, slot, camper_age_group)
+                individual.set_session(camper_id, slot, "-")
+
+            options = [workshop for workshop in dict.fromkeys(campers[camper_id]['preferences'])
+                       if workshop != current_workshop]
+            random.shuffle(options)
+            for workshop in options:
+                if individual.can_assign(camper_id, workshop, slot, camper_age_group):
+                    individual.add_booking(camper_id, workshop, slot, camper_age_group)
+                    individual.set_session(camper_id, slot, workshop)
+                    break
+
+    def fitness_population(self, population):
+        # Cached scores by schedule fingerprint; only unseen schedules are evaluated, in a single batch
+        scores = [None] * len(population)
+        missing = {}
+        for i, schedule in enumerate(population):
+            key = schedule.fingerprint
+            if key in self.fitness_cache:
+                self.fitness_cache.move_to_end(key)
+                scores[i] = self.fitness_cache[key]
+                self.cache_hits += 1
+            elif key in missing:
+                missing[key].append(i)
+                self.cache_hits += 1
+            else:
+                missing[key] = [i]
+                self.cache_misses += 1
+
+        if missing:
+            batch = [population[positions[0]] for positions in missing.values()]
+            for (key, positions), score in zip(missing.items(), self.evaluate_population(batch)):
+                self.fitness_cache[key] = score
+                for i in positions:
+                    scores[i] = score
+            while len(self.fitness_cache) > self.fitness_cache_size:
+                self.fitness_cache.popitem(last=False)
+
+        return scores
+
+    def checkpoint_settings(self):
+        # Everything a resumed run has to share with the saved one to continue it exactly; the generation count
+        # is left out, so a finished run can be extended
+        camper_names = '\0'.join(map(str, get_index(self.configuration).camper_names))
+        return {
+            'campers': hashlib.blake2b(camper_names.encode(), digest_size=16).hexdigest(),
+            'schedule_cls': self.schedule_cls.__name__,
+            'population_size': self.population_size,
+            'crossover_rate': self.crossover_rate,
+            'mutation_rate': self.mutation_rate,
+            'crossover_mode': self.crossover_mode,
+            'parallel': self.workers > 1,  # Pool runs draw a seed per pair instead of breeding in-process
+            'local_search': self.local_search,
+            'elite_size': self.elite_size,
+        }
+
+    @Metrics.timed('ga.checkpoint')
+    def write_checkpoint(self, generation, best_fitness, no_improvement_counter):
+        # The state at the top of a generation, in one pickle so individuals shared between the population and
+        # best_schedule stay shared. Schedules leave their configuration out, which keeps the file small. The file is
+        # replaced atomically, so a crash while writing keeps the previous checkpoint.
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'settings': self.checkpoint_settings(),
+            'generation': generation,
+            'population': self.population,
+            'best_schedule': self.best_schedule,
+            'best_fitness': best_fitness,
+            'no_improvement_counter': no_improvement_counter,
+            'fitness_cache': self.fitness_cache,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'random_state': random.getstate(),
+            'run_seed': self.run_seed,
+        }
+        os.makedirs(os.path.dirname(self.checkpoint) or '.', exist_ok=True)
+        temporary_path = f'{self.checkpoint}.tmp'
+        with open(temporary_path, 'wb') as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, self.checkpoint)
+        Metrics.count('ga.checkpoints')
+
+    def read_checkpoint(self):
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            print(f"No checkpoint found at {self.checkpoint}, starting a new run.")
+            return None
+        with open(self.checkpoint, 'rb') as file:
+            state = pickle.load(file)
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"{self.checkpoint} is not a checkpoint of this version")
+        settings = self.checkpoint_settings()
+        changed = [name for name, value in state['settings'].items() if settings.get(name) != value]
+        if changed:
+            written_by = f" by the run with seed {state['run_seed']}" if state.get('run_seed') is not None else ""
+            raise ValueError(f"{self.checkpoint} was written{written_by} with different {', '.join(changed)}")
+
+        for individual in state['population']:
+            individual.bind(self.configuration)
+        if state['best_schedule'] is not None:
+            state['best_schedule'].bind(self.configuration)
+        self.fitness_cache = state.pop('fitness_cache')
+        self.cache_hits = state.pop('cache_hits')
+        self.cache_misses = state.pop('cache_misses')
+        print(f"Resuming from {self.checkpoint} at generation {state['generation'] + 1}.")
+        if self.local_search > 0:
+            print("The local search stops on time, so the resumed run will not match an uninterrupted one exactly.")
+        return state
+
+    @property
+    def cache_hit_rate(self):
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
+    def evaluate_population(self, population):
+        # Schedules keep completion and satisfaction totals up to date as they change, so this is O(1) per schedule
+        total_campers = len(self.configuration['campers'])
+        return [self.score(schedule.fully_scheduled, schedule.satisfaction_score, total_campers)
+                for schedule in population]
+
     def fitness(self, schedule):
+        return self.fitness_population([schedule])[0]
+
+    @staticmethod
+    def score(fully_scheduled, satisfaction_score, total_campers):
         fitness_score = 0
-        total_campers = len(schedule.configuration['campers'])
-        fully_scheduled = 0  # Tracks campers with all 3 slots assigned (non-dash)
-        satisfaction_score = 0  # Tracks satisfaction based on preferences
-
-        for camper_id, workshops in schedule.schedule.items():
-            # Count how many non-dash slots are filled (for completion rate)
-            slots_filled = sum(1 for workshop, _ in workshops if workshop != "-")
-
-            # Count how many preferences were satisfied
-            preferences = set(schedule.configuration['campers'][camper_id]['preferences'])
-            satisfied = sum(1 for workshop, _ in workshops if workshop in preferences)
-
-            # Heavily reward for fully scheduling 3 preferences, medium for 2, minimal for 1
-            if satisfied == 3:
-                satisfaction_score += 3  # High reward for all 3 preferences
-            elif satisfied == 2:
-                satisfaction_score += 2  # Medium reward for 2 preferences
-            elif satisfied == 1:
-                satisfaction_score += 1  # Low reward for 1 preference
-
-            # For completion rate, we consider campers fully scheduled if they have no dashes
-            if slots_filled == 3:
-                fully_scheduled += 1
 
         # Calculate completion rate based on how many campers have all 3 slots filled
         completion_rate = fully_scheduled / total_campers
@@ -70,46 +266,56 @@ class GeneticAlgorithm:
         return selected
 
     def crossover(self, parent1, parent2):
-        # Initialize children schedules with empty structures
-        child1 = Schedule(self.configuration)
-        child2 = Schedule(self.configuration)
-
         # Randomly decide to use 1 or 2 crossover points
         crossover_points = sorted(random.sample(range(1, 3), random.choice([1, 2])))  # Either 1 or 2 crossover points
 
-        # Process each camper's schedule by combining parts of schedules from both parents
-        all_campers = set(parent1.schedule.keys()).union(parent2.schedule.keys())
-        for camper_id in all_campers:
-            if camper_id in parent1.schedule and camper_id in parent2.schedule:
-                # Merge schedule from both parents based on crossover points
-                if len(crossover_points) == 1:
-                    # 1 crossover point
-                    child1_sessions = parent1.schedule[camper_id][:crossover_points[0]] + \
-                                      parent2.schedule[camper_id][crossover_points[0]:]
-
-                    child2_sessions = parent2.schedule[camper_id][:crossover_points[0]] + \
-                                      parent1.schedule[camper_id][crossover_points[0]:]
-                else:
-                    # 2 crossover points
-                    child1_sessions = parent1.schedule[camper_id][:crossover_points[0]] + \
-                                      parent2.schedule[camper_id][crossover_points[0]:crossover_points[1]] + \
-                                      parent1.schedule[camper_id][crossover_points[1]:]
-
-                    child2_sessions = parent2.schedule[camper_id][:crossover_points[0]] + \
-                                      parent1.schedule[camper_id][crossover_points[0]:crossover_points[1]] + \
-                                      parent2.schedule[camper_id][crossover_points[1]:]
-
-                # Ensure valid sessions and update session bookings
-                child1.schedule[camper_id] = child1.ensure_valid_sessions(camper_id, child1_sessions,
-                                                                          child1.session_bookings)
-                child2.schedule[camper_id] = child2.ensure_valid_sessions(camper_id, child2_sessions,
-                                                                          child2.session_bookings)
-
+        # Children are rebuilt from scratch by the schedule class, which CompactSchedule does on its arrays
+        return self.schedule_cls.offspring(self.configuration, parent1, parent2, crossover_points)
+
+    def delta_crossover(self, parent1, parent2):
+        # Same crossover points as crossover(), but each child starts as a copy of one parent and only the genes
+        # where the parents disagree inside the swapped slots are exchanged and repaired
+        crossover_points = sorted(random.sample(range(1, 3), random.choice([1, 2])))
+        if len(crossover_points) == 1:
+            swapped_slots = range(crossover_points[0], 3)
+        else:
+            swapped_slots = range(crossover_points[0], crossover_points[1])
+
+        genes = parent1.differing_sessions(parent2, swapped_slots)
+        child1 = self.apply_genes(parent1.copy(), [(c, slot, own, other) for c, slot, own, other in genes])
+        child2 = self.apply_genes(parent2.copy(), [(c, slot, other, own) for c, slot, own, other in genes])
         return child1, child2
 
+    def apply_genes(self, child, genes):
+        # genes: (camper, slot, outgoing workshop, incoming workshop)
+        campers = self.configuration['campers']
+
+        # Release every outgoing session first so incoming ones can reuse the freed seats and sessions
+        for camper_id, slot, outgoing, _ in genes:
+            if outgoing != "-":
+                child.remove_booking(camper_id, outgoing, slot, campers[camper_id]['age_group'])
+            child.set_session(camper_id, slot, "-")
+
+        # Book incoming sessions that still fit; the rest stay unassigned, as in ensure_valid_sessions
+        for camper_id, slot, _, incoming in genes:
+            camper_age_group = campers[camper_id]['age_group']
+            if incoming != "-" and child.can_assign(camper_id, incoming, slot, camper_age_group):
+                child.add_booking(camper_id, incoming, slot, camper_age_group)
+                child.set_session(camper_id, slot, incoming)
+
+        # Leave the child in the state a rebuilt one is in, so both modes mutate alike
+        child.forget_slots()
+        return child
+
+    def make_offspring(self, parent1, parent2):
+        if self.crossover_mode == 'delta':
+            return self.delta_crossover(parent1, parent2)
+        return self.crossover(parent1, parent2)
+
     def mutation(self, individual):
         if random.random() < self.mutation_rate:
-            camper_id = random.choice(list(individual.schedule.keys()))
+            # Every camper is scheduled, so drawing from the index picks the same camper as the schedule's keys
+            camper_id = random.choice(get_index(self.configuration).camper_names)
             camper_age_group = self.configuration['campers'][camper_id]['age_group']
             preferences = self.configuration['campers'][camper_id]['preferences']
 
@@ -126,28 +332,128 @@ class GeneticAlgorithm:
                         if individual.can_assign(camper_id, new_workshop, slot_to_mutate, camper_age_group):
                             # Remove old booking if it exists
                             old_workshop = individual.schedule[camper_id][slot_to_mutate][0]
-                            age_group_key = 'young' if camper_age_group in individual.young_group else 'old'
-                            if old_workshop != "-" and camper_id in \
-                                    individual.session_bookings[old_workshop][slot_to_mutate][age_group_key]:
-                                individual.session_bookings[old_workshop][slot_to_mutate][age_group_key].remove(
-                                    camper_id)
+                            if old_workshop != "-":
+                                individual.remove_booking(camper_id, old_workshop, slot_to_mutate, camper_age_group)
 
                             # Assign new workshop and update bookings, respecting the age group segregation
-                            individual.schedule[camper_id][slot_to_mutate] = (new_workshop, slot_to_mutate)
+                            individual.set_session(camper_id, slot_to_mutate, new_workshop)
                             individual.add_booking(camper_id, new_workshop, slot_to_mutate, camper_age_group)
 
+    @Metrics.timed('ga.local_search')
+    def improve_elite(self, fitness_scores):
+        # Memetic stage: hill-climb the best individuals in place, sharing the generation's budget between them
+        total_campers = len(self.configuration['campers'])
+        end = time.perf_counter() + self.local_search
+        ranking = sorted(range(len(fitness_scores)), key=fitness_scores.__getitem__, reverse=True)
+        elite = list({id(self.population[i]): self.population[i] for i in ranking}.values())[:self.elite_size]
+
+        for position, individual in enumerate(elite):
+            now = time.perf_counter()
+            deadline = now + (end - now) / (len(elite) - position)
+            moves = LocalSearch.improve(individual, deadline,
+                                        lambda completed, satisfied: self.score(completed, satisfied, total_campers))
+            Metrics.count('local_search.moves', moves)
+            if moves:
+                # Scores are cached by content, so the improved schedule is simply looked up under its new fingerprint
+                score = self.fitness(individual)
+                # The same individual can fill several places of the population
+                for i, member in enumerate(self.population):
+                    if member is individual:
+                        fitness_scores[i] = score
+
+    def breed(self, pairs, seeds):
+        # Crossover and mutation for each parent pair, each pair driven by its own seed so the
+        # offspring do not depend on how pairs are split between worker processes
+        children = []
+        for (parent1, parent2), seed in zip(pairs, seeds):
+            random.seed(seed)
+            if random.random() < self.crossover_rate:
+                offspring = self.make_offspring(parent1, parent2)
+            else:
+                # Copies, so a parent picked more than once in a chunk is not mutated through every pick
+                offspring = (parent1.copy(), parent2.copy())
+            for individual in offspring:
+                self.mutation(individual)
+            children.extend(offspring)
+        return children
+
+    def breed_in_parallel(self, pool, selected_individuals):
+        pairs = [(selected_individuals[i], selected_individuals[i + 1]) for i in range(0, len(selected_individuals), 2)]
+        seeds = [random.getrandbits(64) for _ in pairs]
+        if pool is None:
+            # Same seeds, so the offspring are those a pool would have bred; breed() reseeds the generator, which
+            # in a pool only happens in the workers
+            state = random.getstate()
+            children = self.breed(pairs, seeds)
+            random.setstate(state)
+            return children
+
+        chunk_size = -(-len(pairs) // self.processes)
+        futures = [pool.submit(breed_chunk, pairs[i:i + chunk_size], seeds[i:i + chunk_size])
+                   for i in range(0, len(pairs), chunk_size)]
+
+        next_population = []
+        for future in futures:
+            children, scores, metrics = future.result()
+            Metrics.merge(metrics)
+            for child, score in zip(children, scores):
+                child.bind(self.configuration)
+                self.fitness_cache[child.fingerprint] = score
+            next_population.extend(children)
+        while len(self.fitness_cache) > self.fitness_cache_size:
+            self.fitness_cache.popitem(last=False)
+        return next_population
+
+    def pool_size(self):
+        # Processes worth starting: no more than the cores this process may run on, as extra processes on a busy
+        # core only add the cost of shipping schedules to them
+        if self.workers < 2:
+            return 0
+        cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+        processes = min(self.workers, cpus) if cpus > 1 else 0
+        if processes < self.workers:
+            print(f"{self.workers} workers requested but {cpus} core(s) available, breeding "
+                  + (f"with {processes} processes" if processes else "in-process"))
+        return processes
+
     def run(self):
+        self.processes = self.pool_size()
+        if self.processes:
+            get_index(self.configuration)  # Build the shared index before it is shipped to the workers
+            with ProcessPoolExecutor(max_workers=self.processes, initializer=init_worker,
+                                     initargs=(self.configuration, self.schedule_cls,
+                                               self.crossover_rate, self.mutation_rate,
+                                               self.crossover_mode, Metrics.enabled)) as pool:
+                return self.evolve(pool)
+        return self.evolve(None)
+
+    @Metrics.timed('ga.evolve')
+    def evolve(self, pool):
         best_fitness_current = -float('inf')
         no_improvement_counter = 0
         improvement_threshold = 100  # Number of generations with no improvement before stopping early
+        start = 0
+        if self.resume_state is not None:
+            start = self.resume_state['generation']
+            best_fitness_current = self.resume_state['best_fitness']
+            no_improvement_counter = self.resume_state['no_improvement_counter']
+            random.setstate(self.resume_state['random_state'])
+            self.resume_state = None
+
+        for generation in range(start, self.generations):
+            if self.checkpoint_interval and generation > start and generation % self.checkpoint_interval == 0:
+                self.write_checkpoint(generation, best_fitness_current, no_improvement_counter)
+            Metrics.count('ga.generations')
 
-        for generation in range(self.generations):
             # Calculate fitness for each schedule in the population
-            fitness_scores = [self.fitness(schedule) for schedule in self.population]
+            fitness_scores = self.fitness_population(self.population)
+            if self.local_search > 0:
+                self.improve_elite(fitness_scores)
 
-            # Find the best schedule of the current generation
-            best_current = max(self.population, key=self.fitness)
-            best_fitness_generation = self.fitness(best_current)
+            # Find the best schedule of the current generation (first one on ties, as max() picks)
+            best_index = max(range(len(fitness_scores)), key=fitness_scores.__getitem__)
+            best_current = self.population[best_index]
+            best_fitness_generation = fitness_scores[best_index]
 
             # Debug statement: Print generation number and best fitness score
             print(f"Generation {generation + 1}/{self.generations} - Best Fitness: {best_fitness_generation}")
@@ -167,20 +473,24 @@ class GeneticAlgorithm:
             # Selection process
             selected_individuals = self.selection(self.population, fitness_scores)
 
-            next_population = []
-            for i in range(0, len(selected_individuals), 2):
-                if random.random() < self.crossover_rate:
-                    parent1, parent2 = selected_individuals[i], selected_individuals[i + 1]
-                    child1, child2 = self.crossover(parent1, parent2)
-                    next_population.extend([child1, child2])
-                else:
-                    next_population.extend([selected_individuals[i], selected_individuals[i + 1]])
-
-            # Apply mutation to the next population
-            for individual in next_population:
-                self.mutation(individual)
+            if self.workers > 1:
+                # Offspring are bred from a seed per pair, by the pool's workers when there is one
+                self.population = self.breed_in_parallel(pool, selected_individuals)
+            else:
+                next_population = []
+                for i in range(0, len(selected_individuals), 2):
+                    if random.random() < self.crossover_rate:
+                        parent1, parent2 = selected_individuals[i], selected_individuals[i + 1]
+                        child1, child2 = self.make_offspring(parent1, parent2)
+                        next_population.extend([child1, child2])
+                    else:
+                        next_population.extend([selected_individuals[i], selected_individuals[i + 1]])
+
+                # Apply mutation to the next population
+                for individual in next_population:
+                    self.mutation(individual)
 
-            self.population = next_population
+                self.population = next_population
 
             # Elitism: Preserve the best individual from the current generation
             if not self.best_schedule or best_fitness_generation > self.fitness(self.best_schedule):
@@ -189,6 +499,8 @@ class GeneticAlgorithm:
         # Final best schedule after all generations
         final_best_fitness = self.fitness(self.best_schedule)
         print(f"Final Best Fitness: {final_best_fitness}")
+        print(f"Fitness cache: {self.cache_hits} hits, {self.cache_misses} misses "
+              f"({self.cache_hit_rate * 100:.1f}% hit rate)")
 
         return self.best_schedule
 
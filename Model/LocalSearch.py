@@ -0,0 +1,168 @@
+import random
+import time
+from collections import deque
+
+from Model import Metrics
+from Model.CampIndex import get_index
+
+
+# Hill climbing on a single schedule with moves that only ever raise its fitness:
+#   relocate - move a camper's slot from '-' or an unwanted workshop into a preferred session with a free seat,
+#              or fill a '-' slot with any free seat when that completes the camper
+#   swap     - exchange the workshops of two campers of the same age group in the same slot, so seats and
+#              sessions stay as they are
+# Every move is scored in O(1) from the two campers' sessions and the live seat counters before it is made.
+
+
+def preferred(preferences, workshop):
+    return workshop != "-" and workshop in preferences
+
+
+def move_gain(schedule, camper_id, slot, workshop):
+    # (completed campers, met preferences) gained by putting camper_id in workshop in slot
+    sessions = schedule.schedule[camper_id]
+    preferences = schedule.configuration['campers'][camper_id]['preferences']
+    current = sessions[slot][0]
+    satisfied = preferred(preferences, workshop) - preferred(preferences, current)
+    completed = 0
+    if (current == "-") != (workshop == "-"):
+        filled = sum(1 for w, _ in sessions if w != "-")
+        completed = int(filled == 2) if current == "-" else -int(filled == 3)
+    return completed, satisfied
+
+
+def has_seat(schedule, workshop, slot, camper_age_group):
+    # A free seat the camper's age group may take, opening a new session only while the slot has room for one
+    remaining = schedule.get_remain_sit(workshop, slot, camper_age_group)
+    if remaining <= 0 or not schedule.is_compatible_age_group(workshop, slot, camper_age_group):
+        return False
+    return remaining < schedule.max_slots_per_workshop or schedule.can_start_new_session_in_slot(slot)
+
+
+def move(schedule, camper_id, slot, workshop, camper_age_group):
+    current = schedule.schedule[camper_id][slot][0]
+    if current != "-":
+        schedule.remove_booking(camper_id, current, slot, camper_age_group)
+    schedule.set_session(camper_id, slot, workshop)
+    if workshop != "-":
+        schedule.add_booking(camper_id, workshop, slot, camper_age_group)
+
+
+def swap(schedule, camper_id, other_id, slot, camper_age_group):
+    # Both campers are in the same age group, so each takes the other's seat
+    workshop = schedule.schedule[camper_id][slot][0]
+    other_workshop = schedule.schedule[other_id][slot][0]
+    schedule.remove_booking(camper_id, workshop, slot, camper_age_group)
+    schedule.remove_booking(other_id, other_workshop, slot, camper_age_group)
+    schedule.set_session(camper_id, slot, other_workshop)
+    schedule.set_session(other_id, slot, workshop)
+    schedule.add_booking(camper_id, other_workshop, slot, camper_age_group)
+    schedule.add_booking(other_id, workshop, slot, camper_age_group)
+
+
+def swap_partner(schedule, camper_id, slot, workshop, gain):
+    # A camper of the same age group in workshop's session for whom the exchange is a net fitness gain
+    current = schedule.schedule[camper_id][slot][0]
+    own_completed, own_satisfied = move_gain(schedule, camper_id, slot, workshop)
+    age_group_key = get_index(schedule.configuration).age_group_key(camper_id)
+    for other_id in schedule.session_campers(workshop, slot, age_group_key):
+        if any(w == current for w, _ in schedule.schedule[other_id]):
+            continue
+        completed, satisfied = move_gain(schedule, other_id, slot, current)
+        if gain(own_completed + completed, own_satisfied + satisfied) > 0:
+            return other_id
+    return None
+
+
+def improve_camper(schedule, camper_id, workshops, gain, seats=None):
+    # First improving move for one of the camper's slots; with seats, only a relocation into one of those free
+    # (workshop, slot) seats. Returns the campers it moved (none when there was none).
+    camper = schedule.configuration['campers'][camper_id]
+    camper_age_group, preferences = camper['age_group'], camper['preferences']
+    for slot in range(3):
+        sessions = schedule.schedule[camper_id]
+        current = sessions[slot][0]
+        if preferred(preferences, current):
+            continue
+        held = {w for w, _ in sessions}
+        candidates = [w for w in dict.fromkeys(preferences) if w not in held]
+        if current == "-" and sum(1 for w, _ in sessions if w != "-") == 2:
+            # Any free seat completes the camper, preferred ones first
+            candidates += [w for w in workshops if w not in held and w not in preferences]
+
+        if seats is not None:
+            candidates = [workshop for workshop in candidates if (workshop, slot) in seats]
+        for workshop in candidates:
+            if has_seat(schedule, workshop, slot, camper_age_group):
+                if gain(*move_gain(schedule, camper_id, slot, workshop)) > 0:
+                    move(schedule, camper_id, slot, workshop, camper_age_group)
+                    Metrics.count('local_search.relocations')
+                    return [camper_id]
+            elif seats is None and current != "-" and schedule.get_remain_sit(workshop, slot, camper_age_group) <= 0:
+                other_id = swap_partner(schedule, camper_id, slot, workshop, gain)
+                if other_id is not None:
+                    swap(schedule, camper_id, other_id, slot, camper_age_group)
+                    Metrics.count('local_search.swaps')
+                    return [camper_id, other_id]
+    return []
+
+
+def improve(schedule, deadline, gain):
+    # Passes over the campers in random order until a whole pass finds no improving move or time.perf_counter()
+    # reaches deadline. gain(completed campers, met preferences) is the fitness change of a move, which must be
+    # positive for the move to be made. Returns the number of moves made.
+    configuration = schedule.configuration
+    workshops = [workshop for workshop in configuration['workshops'] if workshop != "-"]
+    camper_names = list(get_index(configuration).camper_names)
+    moves = 0
+    improved = True
+    while improved:
+        improved = False
+        random.shuffle(camper_names)
+        for camper_id in camper_names:
+            if time.perf_counter() >= deadline:
+                return moves
+            if improve_camper(schedule, camper_id, workshops, gain):
+                moves += 1
+                improved = True
+    return moves
+
+
+def waiting_campers(schedule, sessions):
+    # Campers of the right age group who want one of the (workshop, slot, age group key) sessions and do not have it
+    # or another preferred workshop in that slot, looked up in the index rather than scanning every camper
+    index = get_index(schedule.configuration)
+    campers = schedule.configuration['campers']
+    waiting = {}
+    for workshop, slot, age_group_key in sessions:
+        for camper_id in index.interested_campers(workshop, age_group_key):
+            if camper_id in schedule.schedule and \
+                    not preferred(campers[camper_id]['preferences'], schedule.schedule[camper_id][slot][0]):
+                waiting[camper_id] = index.camper_ids[camper_id]
+    return sorted(waiting, key=waiting.__getitem__)
+
+
+def repair(schedule, camper_ids, gain, seats=None):
+    # Every improving move for camper_ids (only into seats, when given). A camper waiting for a seat that a move
+    # freed may then take it, freeing their own seat in turn, and so on down the chain. Everybody else keeps their
+    # sessions. Returns the campers that were moved.
+    workshops = [workshop for workshop in schedule.configuration['workshops'] if workshop != "-"]
+    index = get_index(schedule.configuration)
+    queue = deque((camper_id, seats) for camper_id in dict.fromkeys(camper_ids))
+    changed = set()
+    while queue:
+        camper_id, seats = queue.popleft()
+        before = list(schedule.schedule[camper_id])
+        moved = improve_camper(schedule, camper_id, workshops, gain, seats)
+        while moved:
+            changed.update(moved)
+            moved = improve_camper(schedule, camper_id, workshops, gain, seats)
+
+        age_group_key = index.age_group_key(camper_id)
+        after = schedule.schedule[camper_id]
+        freed = [(workshop, slot, age_group_key) for (workshop, slot), (now, _) in zip(before, after)
+                 if workshop != "-" and workshop != now]
+        if freed:
+            freed_seats = {(workshop, slot) for workshop, slot, _ in freed}
+            queue.extend((waiting_id, freed_seats) for waiting_id in waiting_campers(schedule, freed))
+    return changed
@@ -0,0 +1,84 @@
+import functools
+import json
+import time
+from contextlib import contextmanager
+
+
+# Run instrumentation: phase timings and hot-path counters, all off until enable() is called.
+# While disabled, count() and phase() return at once, and can_assign skips its counters after a single flag check.
+enabled = False
+phases = {}    # phase name -> seconds
+counters = {}  # counter name -> count
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def count(name, amount=1):
+    if enabled:
+        counters[name] = counters.get(name, 0) + amount
+
+
+@contextmanager
+def phase(name):
+    # Adds the time spent in the block to the phase (phases can repeat and nest)
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def timed(name):
+    # Decorator form of phase()
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            with phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    return {'phases': dict(phases), 'counters': dict(counters)}
+
+
+def drain():
+    # Snapshot and reset, to ship the metrics of one process or iteration elsewhere
+    metrics = snapshot()
+    phases.clear()
+    counters.clear()
+    return metrics
+
+
+def merge(metrics, into=None):
+    # Add a snapshot to another snapshot, or to this process's live metrics by default
+    timings, totals = (phases, counters) if into is None else (into['phases'], into['counters'])
+    for name, seconds in metrics['phases'].items():
+        timings[name] = timings.get(name, 0.0) + seconds
+    for name, amount in metrics['counters'].items():
+        totals[name] = totals.get(name, 0) + amount
+
+
+def rates(metrics):
+    derived = {}
+    timings, totals = metrics['phases'], metrics['counters']
+    if timings.get('ga.evolve'):
+        derived['ga.generations_per_second'] = totals.get('ga.generations', 0) / timings['ga.evolve']
+    if totals.get('can_assign.calls'):
+        rejected = sum(amount for name, amount in totals.items() if name.startswith('can_assign.rejected.'))
+        derived['can_assign.rejection_rate'] = rejected / totals['can_assign.calls']
+    return derived
+
+
+def write(file_path, report):
+    with open(file_path, 'w') as file:
+        json.dump(report, file, indent=2, sort_keys=True)
@@ -0,0 +1,153 @@
+import heapq
+from collections import deque
+
+
+INFINITY = float('inf')
+
+
+class MinCostFlow:
+    # Min-cost max-flow over integer capacities and non-negative integer costs.
+    # Each phase runs Dijkstra with node potentials to find the current shortest distances, then pushes a blocking
+    # flow (Dinic) through the edges that lie on a shortest path, so one phase augments many unit paths at once.
+    # Edges are stored in flat lists; edge e and e ^ 1 are a forward edge and its residual.
+    def __init__(self, num_nodes):
+        self.num_nodes = num_nodes
+        self.adjacency = [[] for _ in range(num_nodes)]
+        self.to = []
+        self.capacity = []
+        self.cost = []
+
+    def add_node(self):
+        self.adjacency.append([])
+        self.num_nodes += 1
+        return self.num_nodes - 1
+
+    def add_edge(self, source, target, capacity, cost=0):
+        edge = len(self.to)
+        self.adjacency[source].append(edge)
+        self.to.append(target)
+        self.capacity.append(capacity)
+        self.cost.append(cost)
+        self.adjacency[target].append(edge + 1)
+        self.to.append(source)
+        self.capacity.append(0)
+        self.cost.append(-cost)
+        return edge
+
+    def flow(self, edge):
+        # Units currently sent through a forward edge
+        return self.capacity[edge ^ 1]
+
+    def shortest_distances(self, source, potential):
+        to, capacity, cost, adjacency = self.to, self.capacity, self.cost, self.adjacency
+        distance = [INFINITY] * self.num_nodes
+        distance[source] = 0
+        heap = [(0, source)]
+        while heap:
+            dist, node = heapq.heappop(heap)
+            if dist > distance[node]:
+                continue
+            for edge in adjacency[node]:
+                if capacity[edge] > 0:
+                    target = to[edge]
+                    candidate = dist + cost[edge] + potential[node] - potential[target]
+                    if candidate < distance[target]:
+                        distance[target] = candidate
+                        heapq.heappush(heap, (candidate, target))
+        return distance
+
+    def blocking_flow(self, source, sink, potential):
+        to, capacity, cost, adjacency = self.to, self.capacity, self.cost, self.adjacency
+
+        def admissible(node, edge):
+            return capacity[edge] > 0 and cost[edge] + potential[node] - potential[to[edge]] == 0
+
+        pushed = 0
+        while True:
+            # BFS levels over the admissible edges
+            level = [-1] * self.num_nodes
+            level[source] = 0
+            queue = [source]
+            for node in queue:
+                for edge in adjacency[node]:
+                    if level[to[edge]] < 0 and admissible(node, edge):
+                        level[to[edge]] = level[node] + 1
+                        queue.append(to[edge])
+            if level[sink] < 0:
+                return pushed
+
+            # Iterative DFS with current-arc pointers, pushing one bottleneck per path found
+            current = [0] * self.num_nodes
+            while True:
+                path = []
+                node = source
+                while node != sink:
+                    edges = adjacency[node]
+                    while current[node] < len(edges):
+                        edge = edges[current[node]]
+                        if level[to[edge]] == level[node] + 1 and admissible(node, edge):
+                            break
+                        current[node] += 1
+                    else:
+                        # Dead end: drop it from the level graph and retreat
+                        if not path:
+                            break
+                        level[node] = -1
+                        edge = path.pop()
+                        node = to[edge ^ 1]
+                        current[node] += 1
+                        continue
+                    path.append(edge)
+                    node = to[edge]
+                if node != sink:
+                    break
+
+                bottleneck = min(capacity[edge] for edge in path)
+                self.push(path, bottleneck)
+                pushed += bottleneck
+
+    def solve(self, source, sink):
+        # Returns (flow, cost) of a min-cost max-flow from source to sink
+        potential = [0] * self.num_nodes
+        total_flow = 0
+        while True:
+            distance = self.shortest_distances(source, potential)
+            if distance[sink] == INFINITY:
+                break
+            for node in range(self.num_nodes):
+                if distance[node] < INFINITY:
+                    potential[node] += distance[node]
+            total_flow += self.blocking_flow(source, sink, potential)
+
+        total_cost = sum(self.cost[edge] * self.capacity[edge ^ 1] for edge in range(0, len(self.to), 2))
+        return total_flow, total_cost
+
+    def push(self, path, amount=1):
+        for edge in path:
+            self.capacity[edge] -= amount
+            self.capacity[edge ^ 1] += amount
+
+    def residual_path(self, start, sink, allowed=None, avoid=()):
+        # Shortest (in edges) augmenting path from start to sink in the residual network, ignoring costs.
+        # allowed(edge) can veto individual residual edges; nodes in avoid are never entered.
+        to, capacity, adjacency = self.to, self.capacity, self.adjacency
+        previous = {start: None}
+        queue = deque([start])
+        while queue and sink not in previous:
+            node = queue.popleft()
+            for edge in adjacency[node]:
+                target = to[edge]
+                if capacity[edge] > 0 and target not in previous and target not in avoid and \
+                        (allowed is None or allowed(edge)):
+                    previous[target] = edge
+                    queue.append(target)
+        if sink not in previous:
+            return None
+
+        path = []
+        node = sink
+        while node != start:
+            path.append(previous[node])
+            node = to[previous[node] ^ 1]
+        path.reverse()
+        return path
@@ -1,6 +1,9 @@
 from random import random
 import random
 
+from Model import LocalSearch, Metrics
+from Model.CampIndex import AGE_GROUP_KEYS, OLDER_GROUP, YOUNG_GROUP, age_bucket, get_index
+
 
 class Schedule:
     def __init__(self, configuration):
@@ -14,21 +17,29 @@ class Schedule:
         self.max_slots_per_workshop = 15  # Max capacity of each session
         self.min_slots_per_workshop = 5   # Minimum number of campers required to hold a session
         self.max_sessions_per_slot = 35   # Maximum number of sessions per slot
-        self.young_group = {'Nanobyte', 'Kilobyte'}
-        self.older_group = {'Megabyte', 'Gigabyte'}
+        self.sessions_per_slot = [0, 0, 0]  # Live count of open sessions per slot, kept in sync with session_bookings
+        self.fingerprint = 0  # XOR of session_hash over every (camper, workshop, slot) in the schedule
+        # Running fitness totals, updated whenever a camper's sessions change
+        self.fully_scheduled = 0  # Campers with all 3 slots filled
+        self.satisfaction_score = 0  # Sum over campers of preferences met
+        self.camper_satisfaction = {}  # Camper -> number of their sessions that are preferred workshops
+        self.held_workshops = {}  # Camper -> bit per workshop id in their sessions
+        self.owns_configuration = False  # Set once a late change has copied the configuration for this schedule
+
+    def add_workshop(self, workshop):
+        # Register a workshop that first appeared after the schedule was created (streamed input)
+        if workshop not in self.configuration['workshops']:
+            self.configuration['workshops'][workshop] = {'name': workshop, 'age_group': None}
+        if workshop not in self.session_bookings:
+            self.session_bookings[workshop] = {slot: {'young': [], 'old': []} for slot in range(3)}
 
     def count_sessions_per_slot(self):
-        session_count = [0, 0, 0]  # For slot 0, 1, 2
-        for workshop, slots in self.session_bookings.items():
-            for slot, age_groups in slots.items():
-                # Count the slot if there are any campers in either age group for this slot
-                if age_groups['young'] or age_groups['old']:
-                    session_count[slot] += 1
-        return session_count
+        # Sessions are counted as they open and close in add_booking / remove_booking, so no rescan is needed
+        Metrics.count('count_sessions_per_slot.calls')
+        return list(self.sessions_per_slot)
 
     def can_start_new_session_in_slot(self, slot):
-        session_count = self.count_sessions_per_slot()
-        return session_count[slot] < self.max_sessions_per_slot
+        return self.sessions_per_slot[slot] < self.max_sessions_per_slot
 
     def is_compatible_age_group(self, workshop, slot, camper_age_group):
         # Example structure: {workshop: {slot: {'young': [], 'old': []}}}
@@ -37,43 +48,54 @@ class Schedule:
             return True  # If all sub-sessions are empty, any age group can start here
 
         # Specific age group handling
-        if camper_age_group in self.young_group and age_group_sessions['young']:
+        if camper_age_group in YOUNG_GROUP and age_group_sessions['young']:
             return True  # Young campers can join if 'young' list is not empty
-        if camper_age_group in self.older_group and age_group_sessions['old']:
+        if camper_age_group in OLDER_GROUP and age_group_sessions['old']:
             return True  # Old campers can join if 'old' list is not empty
 
         return False  # If none of the conditions are met, it's incompatible
 
     def can_assign(self, camper_id, workshop, slot, camper_age_group):
-        # Determine which age group list to check based on camper's age group
-        age_group_key = 'young' if camper_age_group in self.young_group else 'old'
+        # The assignment is possible when none of rejection_reason's checks fails
+        reason = self.rejection_reason(camper_id, workshop, slot, camper_age_group)
+        if Metrics.enabled:
+            Metrics.count('can_assign.calls')
+            if reason is not None:
+                Metrics.count(f'can_assign.rejected.{reason}')
+        return reason is None
+
+    def rejection_reason(self, camper_id, workshop, slot, camper_age_group):
+        # The first check that rules the assignment out, or None when it is possible
+        index = get_index(self.configuration)
+        # Determine which age group list to check from the camper's age bucket
+        age_group_key = AGE_GROUP_KEYS[index.camper_age_buckets[index.camper_ids[camper_id]]]
+        bookings = self.session_bookings[workshop][slot][age_group_key]
 
         # Check for duplicate workshop assignment in the same schedule.
-        if any(workshop == w for w, _ in self.schedule.get(camper_id, [])):
-            return False
+        if self.held_workshops.get(camper_id, 0) >> index.workshop_ids[workshop] & 1:
+            return 'repeated_workshop'
 
         # Check if the slot already has the maximum number of campers for the specific age group.
-        if len(self.session_bookings[workshop][slot][age_group_key]) >= self.max_slots_per_workshop:
-            return False
+        if len(bookings) >= self.max_slots_per_workshop:
+            return 'session_full'
 
         # Check if the camper has already been assigned to this time slot.
         if slot in self.camper_slots.get(camper_id, set()):
-            return False
+            return 'slot_taken'
 
         # Check age group compatibility. This assumes the session_bookings structure now supports age group separation.
         if not self.is_compatible_age_group(workshop, slot, camper_age_group):
-            return False
+            return 'age_group'
 
         # Check if a new session can be started in this slot for the specific age group (i.e., does not exceed the max sessions per slot).
-        if not self.session_bookings[workshop][slot][age_group_key] and not self.can_start_new_session_in_slot(slot):
-            return False
+        if not bookings and not self.can_start_new_session_in_slot(slot):
+            return 'slot_full'
 
         # If all conditions are met, the assignment is possible.
-        return True
+        return None
 
     def get_remain_sit(self, workshop, slot, age_group):
-        age_group_key = 'young' if age_group in self.young_group else 'old'
-        current_campers_num = len(self.session_bookings[workshop][slot][age_group_key]) if self.session_bookings[workshop][slot][age_group_key] else 0
+        current_campers_num = len(self.session_bookings[workshop][slot][AGE_GROUP_KEYS[age_bucket(age_group)]])
         return self.max_slots_per_workshop - current_campers_num
 
     # def assign_with_preferences(self):
@@ -126,7 +148,7 @@ class Schedule:
                     assigned_slots.add(i)
 
             # Update the schedule with the randomly assigned workshops.
-            self.schedule[camper_id] = assigned_workshops
+            self.set_camper_sessions(camper_id, assigned_workshops)
 
     def print_booking(self):
         for w, groups in self.session_bookings.items():
@@ -145,7 +167,6 @@ class Schedule:
         for camper_id, camper_data in self.configuration['campers'].items():
             preferences = camper_data['preferences']
             age_group = camper_data['age_group']
-            age_group_key = 'young' if age_group in self.young_group else 'old'
             assigned_workshops = [("-", i) for i in range(3)]
             assigned_slots = set()
 
@@ -153,37 +174,286 @@ class Schedule:
                 # Determine the slot with the least number of campers assigned in the same age group
                 least_filled_slot = min(
                     range(3),
-                    key=lambda x: sum(len(self.session_bookings[w][x][age_group_key]) for w in preferences)
+                    key=lambda x: sum(self.max_slots_per_workshop - self.get_remain_sit(w, x, age_group) for w in preferences)
                 )
                 for preference in preferences:
                     if i not in assigned_slots and self.can_assign(camper_id, preference, least_filled_slot, age_group):
                         assigned_workshops[least_filled_slot] = (preference, least_filled_slot)
                         self.add_booking(camper_id, preference, least_filled_slot, age_group)
                         assigned_slots.add(least_filled_slot)
-                        self.schedule[camper_id] = assigned_workshops
+                        self.set_camper_sessions(camper_id, assigned_workshops)
                         break
 
                 if assigned_workshops[i][0] == "-":
                     assigned_workshops[i] = ("-", i)
 
-            self.schedule[camper_id] = assigned_workshops
+            self.set_camper_sessions(camper_id, assigned_workshops)
+
+    @classmethod
+    def from_schedule(cls, source):
+        # Rebuild any schedule (e.g. another model's result) as this class. Every camper's sessions are stored in
+        # slot order, which the genetic and local search moves index by (FIFO lists its unfilled slots last).
+        schedule = cls(source.configuration)
+        campers = source.configuration['campers']
+        for camper_id, sessions in source.schedule.items():
+            sessions = sorted(sessions, key=lambda session: session[1])
+            for workshop, slot in sessions:
+                if workshop != "-":
+                    schedule.add_booking(camper_id, workshop, slot, campers[camper_id]['age_group'])
+            schedule.set_camper_sessions(camper_id, sessions)
+        return schedule
+
+    @classmethod
+    def offspring(cls, configuration, parent1, parent2, crossover_points):
+        # The genetic model's crossover: two children built from scratch out of the parents' sessions, split at
+        # the 1 or 2 crossover points (positions in each camper's sessions)
+        child1 = cls(configuration)
+        child2 = cls(configuration)
+
+        # Process each camper's schedule by combining parts of schedules from both parents.
+        # Campers are visited in parent1's order rather than set order, which depends on the process hash seed
+        # and would make offspring differ between runs and worker processes.
+        for camper_id in parent1.schedule.keys():
+            if camper_id in parent2.schedule:
+                # Merge schedule from both parents based on crossover points
+                if len(crossover_points) == 1:
+                    # 1 crossover point
+                    child1_sessions = parent1.schedule[camper_id][:crossover_points[0]] + \
+                                      parent2.schedule[camper_id][crossover_points[0]:]
+
+                    child2_sessions = parent2.schedule[camper_id][:crossover_points[0]] + \
+                                      parent1.schedule[camper_id][crossover_points[0]:]
+                else:
+                    # 2 crossover points
+                    child1_sessions = parent1.schedule[camper_id][:crossover_points[0]] + \
+                                      parent2.schedule[camper_id][crossover_points[0]:crossover_points[1]] + \
+                                      parent1.schedule[camper_id][crossover_points[1]:]
+
+                    child2_sessions = parent2.schedule[camper_id][:crossover_points[0]] + \
+                                      parent1.schedule[camper_id][crossover_points[0]:crossover_points[1]] + \
+                                      parent2.schedule[camper_id][crossover_points[1]:]
+
+                # Ensure valid sessions and update session bookings
+                child1.set_camper_sessions(camper_id, child1.ensure_valid_sessions(camper_id, child1_sessions))
+                child2.set_camper_sessions(camper_id, child2.ensure_valid_sessions(camper_id, child2_sessions))
+
+        return child1, child2
+
+    def add_camper(self, camper_id, age_group, preferences):
+        # Late registration: seat the camper in free seats of their preferred sessions, moving other campers only
+        # where that is a net gain. Returns the campers whose sessions changed.
+        if camper_id in self.configuration['campers']:
+            raise ValueError(f"{camper_id} is already registered")
+        self.own_configuration()
+        for workshop in preferences:
+            if workshop not in self.configuration['workshops']:
+                self.add_workshop(workshop)
+        self.configuration['campers'][camper_id] = {'age_group': age_group, 'preferences': list(preferences)}
+        self.index_campers()
+        self.set_camper_sessions(camper_id, [("-", slot) for slot in range(3)])
+        return self.repair([camper_id]) | {camper_id}
+
+    def remove_camper(self, camper_id):
+        # Cancellation: free the camper's seats and offer them to the campers waiting for those sessions.
+        # Returns the campers whose sessions changed.
+        self.own_configuration()
+        index = get_index(self.configuration)
+        age_group_key = index.age_group_key(camper_id)
+        freed = [(workshop, slot, age_group_key) for workshop, slot in self.release_camper(camper_id)]
+        self.forget_camper(camper_id)
+        del self.configuration['campers'][camper_id]
+        index.remove_camper(camper_id)
+        return self.repair(LocalSearch.waiting_campers(self, freed), {(workshop, slot) for workshop, slot, _ in freed})
+
+    def change_preferences(self, camper_id, preferences):
+        # The camper keeps their seats, which are rescored against the new preferences, and is moved to newly
+        # preferred sessions where there is room. Returns the campers whose sessions changed.
+        self.own_configuration()
+        for workshop in preferences:
+            if workshop not in self.configuration['workshops']:
+                self.add_workshop(workshop)
+        self.index_campers()
+        sessions = list(self.schedule[camper_id])
+        self.set_camper_sessions(camper_id, [("-", slot) for slot in range(3)])  # Withdrawn with the old preferences
+        campers = self.configuration['campers']
+        campers[camper_id] = dict(campers[camper_id], preferences=list(preferences))  # Other copies keep the old one
+        get_index(self.configuration).set_preferences(camper_id, preferences)
+        self.set_camper_sessions(camper_id, sessions)
+        return self.repair([camper_id])
+
+    def own_configuration(self):
+        # Copy on write: before its first late change, a schedule takes its own copy of the configuration's camper
+        # and workshop tables and of the index, so other schedules built from the same configuration are unaffected
+        if self.owns_configuration:
+            return
+        configuration = dict(self.configuration)
+        configuration['campers'] = dict(configuration['campers'])
+        configuration['workshops'] = dict(configuration['workshops'])
+        configuration['index'] = get_index(self.configuration).copy()
+        self.bind(configuration)
+        self.owns_configuration = True
+
+    def release_camper(self, camper_id):
+        # Unbook all of a camper's sessions, leaving them with '-' in every slot; returns the released sessions
+        camper_age_group = self.configuration['campers'][camper_id]['age_group']
+        released = [(workshop, slot) for workshop, slot in self.schedule[camper_id] if workshop != "-"]
+        for workshop, slot in released:
+            self.remove_booking(camper_id, workshop, slot, camper_age_group)
+        self.set_camper_sessions(camper_id, [("-", slot) for slot in range(3)])
+        return released
+
+    def forget_camper(self, camper_id):
+        # Drop a released camper, which is about to leave the configuration
+        del self.schedule[camper_id]
+        self.camper_slots.pop(camper_id, None)
+        self.camper_satisfaction.pop(camper_id, None)
+        self.held_workshops.pop(camper_id, None)
+
+    def forget_slots(self):
+        # Drop the per-camper slot tracking, which ensure_valid_sessions never fills in: children rebuilt by
+        # offspring() carry none, so their mutations may move a booked slot rather than only fill a '-' one
+        self.camper_slots = {}
+
+    def index_campers(self):
+        # Nothing to do here: the dicts grow as campers are added (CompactSchedule resizes its arrays)
+        pass
+
+    def repair(self, camper_ids, seats=None):
+        # Local repair with the genetic model's objective, see Model.LocalSearch.repair
+        from Model.GeneticAlgorithm import GeneticAlgorithm  # Imported here: it imports this module
+
+        total_campers = len(self.configuration['campers'])
+        return LocalSearch.repair(self, camper_ids, lambda completed, satisfied:
+                                  GeneticAlgorithm.score(completed, satisfied, total_campers), seats)
 
     def add_booking(self, camper_id, workshop, slot, camper_age_group):
         # Determine the correct list within the slot based on the camper's age group
-        age_group_key = 'young' if camper_age_group in self.young_group else 'old'
+        age_group_key = AGE_GROUP_KEYS[age_bucket(camper_age_group)]
 
         # Add the camper to the appropriate list in the session bookings
-        self.session_bookings[workshop][slot][age_group_key].append(camper_id)
+        self.join_session(camper_id, workshop, slot, age_group_key)
 
         # Track that the camper has been assigned to this slot, to prevent double-booking them in the same slot
         if camper_id not in self.camper_slots:
             self.camper_slots[camper_id] = set()
         self.camper_slots[camper_id].add(slot)
 
+    def join_session(self, camper_id, workshop, slot, age_group_key):
+        # A session opens in this slot when its first camper (of either age group) is booked
+        if not any(self.session_bookings[workshop][slot].values()):
+            self.sessions_per_slot[slot] += 1
+        self.session_bookings[workshop][slot][age_group_key].append(camper_id)
+
+    def is_booked(self, camper_id, workshop, slot, age_group_key):
+        return camper_id in self.session_bookings[workshop][slot][age_group_key]
+
+    def session_campers(self, workshop, slot, age_group_key):
+        # Campers booked in one age group's side of a session
+        return list(self.session_bookings[workshop][slot][age_group_key])
+
+    def remove_booking(self, camper_id, workshop, slot, camper_age_group):
+        bookings = self.session_bookings[workshop][slot][AGE_GROUP_KEYS[age_bucket(camper_age_group)]]
+        if camper_id not in bookings:
+            return
+
+        bookings.remove(camper_id)
+
+        # The session closes once its last camper has left, freeing room for a new session in this slot
+        if not any(self.session_bookings[workshop][slot].values()):
+            self.sessions_per_slot[slot] -= 1
+
+        if camper_id in self.camper_slots:
+            self.camper_slots[camper_id].discard(slot)
+
+    def session_hash(self, camper_id, workshop, slot):
+        if workshop == "-":
+            return 0
+        index = get_index(self.configuration)
+        return index.session_hash(index.camper_ids[camper_id], slot, index.workshop_ids[workshop])
+
+    def track_sessions(self, camper_id, sessions, sign):
+        # Add (sign=1) or withdraw (sign=-1) a camper's sessions from the fingerprint and the running totals
+        index = get_index(self.configuration)
+        camper = index.camper_ids[camper_id]
+        preference_bits = index.camper_preference_bits[camper]
+        slots_filled = 0
+        satisfied = 0
+        held = 0
+        for workshop, slot in sessions:
+            if workshop == "-":
+                continue
+            workshop_id = index.workshop_ids[workshop]
+            self.fingerprint ^= index.session_hash(camper, slot, workshop_id)
+            slots_filled += 1
+            satisfied += preference_bits >> workshop_id & 1
+            held |= 1 << workshop_id
+
+        if slots_filled == 3:
+            self.fully_scheduled += sign
+        self.satisfaction_score += sign * satisfied
+        if sign > 0:
+            self.camper_satisfaction[camper_id] = satisfied
+            self.held_workshops[camper_id] = held
+
+    def set_camper_sessions(self, camper_id, sessions):
+        self.track_sessions(camper_id, self.schedule.get(camper_id, []), -1)
+        # Store a copy so later edits to the caller's list cannot desync the fingerprint and totals
+        self.schedule[camper_id] = list(sessions)
+        self.track_sessions(camper_id, self.schedule[camper_id], 1)
+
+    def set_session(self, camper_id, slot, workshop):
+        self.track_sessions(camper_id, self.schedule[camper_id], -1)
+        self.schedule[camper_id][slot] = (workshop, slot)
+        self.track_sessions(camper_id, self.schedule[camper_id], 1)
+
+    def differing_sessions(self, other, slots):
+        # (camper, slot, own workshop, other's workshop) wherever the two schedules disagree in the given slots
+        differences = []
+        for camper_id, sessions in self.schedule.items():
+            other_sessions = other.schedule.get(camper_id)
+            if other_sessions is None:
+                continue
+            for slot in slots:
+                if sessions[slot][0] != other_sessions[slot][0]:
+                    differences.append((camper_id, slot, sessions[slot][0], other_sessions[slot][0]))
+        return differences
+
+    def copy(self):
+        # Cheap structural copy sharing the (read-only) configuration
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone.session_bookings = {
+            workshop: {slot: {key: list(campers) for key, campers in age_groups.items()}
+                       for slot, age_groups in slots.items()}
+            for workshop, slots in self.session_bookings.items()
+        }
+        clone.schedule = {camper_id: list(sessions) for camper_id, sessions in self.schedule.items()}
+        clone.camper_slots = {camper_id: set(slots) for camper_id, slots in self.camper_slots.items()}
+        clone.camper_satisfaction = dict(self.camper_satisfaction)
+        clone.held_workshops = dict(self.held_workshops)
+        # Both now share the configuration, so the next late change to either one copies it
+        self.owns_configuration = clone.owns_configuration = False
+        clone.sessions_per_slot = list(self.sessions_per_slot)
+        return clone
+
+    def __getstate__(self):
+        # The configuration is shared by every schedule and is large, so it is not pickled with each one;
+        # the receiving side re-attaches it with bind()
+        state = self.__dict__.copy()
+        state.pop('configuration', None)
+        return state
+
+    def bind(self, configuration):
+        self.configuration = configuration
+        self.owns_configuration = False
+        return self
+
     def add_to_schedule(self, camper_id, workshop, slot):
         if camper_id not in self.schedule.keys():
             self.schedule[camper_id] = []
+        self.track_sessions(camper_id, self.schedule[camper_id], -1)
         self.schedule[camper_id].insert(slot, (workshop, slot))
+        self.track_sessions(camper_id, self.schedule[camper_id], 1)
         # lst = []
         # for idx, w in enumerate(workshops):
         #     lst.insert(slot, (w, slot))
@@ -191,11 +461,11 @@ class Schedule:
 
 
 
-    def ensure_valid_sessions(self, camper_id, sessions, session_bookings):
+    def ensure_valid_sessions(self, camper_id, sessions):
         valid_sessions = []
         assigned_workshops = set()
         camper_age_group = self.configuration['campers'][camper_id]['age_group']
-        age_group_key = 'young' if camper_age_group in self.young_group else 'old'
+        age_group_key = AGE_GROUP_KEYS[age_bucket(camper_age_group)]
 
         for workshop, slot in sessions:
             # Check for valid entry and no duplication of workshops
@@ -203,14 +473,14 @@ class Schedule:
                 # Verify if age group is compatible and if the camper can be assigned to this slot and workshop
                 if self.can_assign(camper_id, workshop, slot, camper_age_group):
                     # Check if workshop and slot are valid and ensure not exceeding capacity
-                    if workshop in session_bookings and slot in session_bookings[workshop]:
+                    if workshop in self.configuration['workshops'] and slot in range(3):
                         # Access the correct list based on age group
-                        if len(session_bookings[workshop][slot][age_group_key]) < self.max_slots_per_workshop:
+                        if self.get_remain_sit(workshop, slot, camper_age_group) > 0:
                             valid_sessions.append((workshop, slot))
                             assigned_workshops.add(workshop)
                             # Add camper to the correct age group list in session bookings if not already there
-                            if camper_id not in session_bookings[workshop][slot][age_group_key]:
-                                session_bookings[workshop][slot][age_group_key].append(camper_id)
+                            if not self.is_booked(camper_id, workshop, slot, age_group_key):
+                                self.join_session(camper_id, workshop, slot, age_group_key)
                         else:
                             # If session is over capacity, append a dash
                             valid_sessions.append(("-", slot))
@@ -0,0 +1,90 @@
+import csv
+import json
+import os
+
+from Model.CampData import AGE_COLUMN, NAME_COLUMN
+
+
+TIME_SLOTS = ['Slot 1 (9:00 AM - 12:00 PM)', 'Slot 2 (1:00 PM - 3:00 PM)', 'Slot 3 (3:00 PM - 6:00 PM)']
+EXPORT_FORMATS = ('.csv', '.xlsx', '.json')
+SESSION_COLUMNS = ['Session', 'Time', 'Group', 'Workshop', 'Campers', 'Capacity', 'Camper names']
+
+
+def camper_columns(schedule):
+    # One pass over the schedule into plain column lists: name, age unit, the workshop of each slot and the
+    # number of preferred workshops
+    campers = schedule.configuration['campers']
+    names, ages, preferred = [], [], []
+    slots = [[] for _ in TIME_SLOTS]
+    for camper_id, workshops in schedule.schedule.items():
+        names.append(camper_id)
+        ages.append(campers[camper_id]['age_group'])
+        preferences = set(campers[camper_id]['preferences'])
+        row = [None] * len(TIME_SLOTS)
+        for workshop, slot in workshops:
+            row[slot] = workshop
+        for column, workshop in zip(slots, row):
+            column.append(workshop)
+        preferred.append(sum(1 for workshop, _ in workshops if workshop != '-' and workshop in preferences))
+    columns = {NAME_COLUMN: names, AGE_COLUMN: ages}
+    columns.update(zip(TIME_SLOTS, slots))
+    columns['Preferred workshops'] = preferred
+    return columns
+
+
+def session_columns(schedule):
+    # Every open session (workshop, slot, age group) with its size and campers, in slot order
+    rows = []
+    for workshop, slots in schedule.session_bookings.items():
+        for slot, age_groups in slots.items():
+            for age_group_key, campers in age_groups.items():
+                if campers:
+                    rows.append((slot + 1, TIME_SLOTS[slot], age_group_key.capitalize(), workshop, len(campers),
+                                 schedule.max_slots_per_workshop, ', '.join(campers)))
+    rows.sort(key=lambda row: row[0])
+    return dict(zip(SESSION_COLUMNS, map(list, zip(*rows)))) if rows else {column: [] for column in SESSION_COLUMNS}
+
+
+def write_csv(columns, file_path):
+    with open(file_path, 'w', newline='', buffering=1 << 20) as file:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        writer.writerows(zip(*columns.values()))
+
+
+def write_excel(sheets, file_path):
+    # A new workbook is streamed in openpyxl's write-only mode; an existing one keeps its other sheets
+    from openpyxl import Workbook, load_workbook
+
+    workbook = load_workbook(file_path) if os.path.exists(file_path) else Workbook(write_only=True)
+    for title, columns in sheets.items():
+        if title in workbook.sheetnames:
+            del workbook[title]
+        sheet = workbook.create_sheet(title)
+        sheet.append(list(columns))
+        for row in zip(*columns.values()):
+            sheet.append(row)
+    workbook.save(file_path)
+
+
+def export_schedule(schedule, file_path):
+    # Write every camper's schedule and the session overview in one go, in the format of the file extension:
+    #   .csv  - campers to file_path, sessions to <name>_sessions.csv next to it
+    #   .xlsx - 'Campers' and 'Sessions' sheets; other sheets of an existing workbook are kept
+    #   .json - {"campers": [...], "sessions": [...]}, one record per row
+    root, extension = os.path.splitext(file_path)
+    extension = extension.lower()
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"export file should end with one of {EXPORT_FORMATS}")
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    campers, sessions = camper_columns(schedule), session_columns(schedule)
+
+    if extension == '.csv':
+        write_csv(campers, file_path)
+        write_csv(sessions, f'{root}_sessions.csv')
+    elif extension == '.xlsx':
+        write_excel({'Campers': campers, 'Sessions': sessions}, file_path)
+    else:
+        with open(file_path, 'w', buffering=1 << 20) as file:
+            json.dump({'campers': [dict(zip(campers, row)) for row in zip(*campers.values())],
+                       'sessions': [dict(zip(sessions, row)) for row in zip(*sessions.values())]}, file)
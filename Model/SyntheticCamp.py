@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from Model.CampData import AGE_COLUMN, NAME_COLUMN, SELECTION_COLUMNS, CampData
+
+
+AGE_UNITS = ['Nanobyte', 'Kilobyte', 'Megabyte', 'Gigabyte']
+AGE_MIX = [0.26, 0.32, 0.26, 0.16]  # Share of each age unit in Data/400campersData.xlsx
+
+
+def synthetic_frame(campers, workshops=36, age_mix=AGE_MIX, skew=0.7, seed=0):
+    # Camper sheet with the same columns as the Excel input, fully determined by the arguments:
+    #   age_mix - weights of AGE_UNITS
+    #   skew    - workshop k (0-based) is picked with weight 1 / (k + 1) ** skew; 0 is uniform, higher is more skewed
+    rng = np.random.default_rng(seed)
+    names = np.array([f'Camper {i:06d}' for i in range(campers)])
+    age_mix = np.asarray(age_mix, dtype=float)
+    ages = np.array(AGE_UNITS)[rng.choice(len(AGE_UNITS), size=campers, p=age_mix / age_mix.sum())]
+
+    # Weighted sampling of distinct selections per camper in one shot: the top keys of log(weight) + Gumbel noise
+    workshop_names = np.array([f'Workshop {i + 1:03d}' for i in range(workshops)])
+    weights = 1.0 / np.arange(1, workshops + 1) ** skew
+    keys = np.log(weights) + rng.gumbel(size=(campers, workshops))
+    selections = np.argsort(-keys, axis=1)[:, :len(SELECTION_COLUMNS)]
+
+    frame = pd.DataFrame({NAME_COLUMN: names, AGE_COLUMN: ages})
+    for column, picks in zip(SELECTION_COLUMNS, selections.T):
+        frame[column] = workshop_names[picks]
+    return frame
+
+
+def synthetic_configuration(campers, workshops=36, age_mix=AGE_MIX, skew=0.7, seed=0):
+    # Configuration dictionary in the shape main.py builds from a file
+    return CampData.from_frame(synthetic_frame(campers, workshops, age_mix, skew, seed)).configuration(slice(None))
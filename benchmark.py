@@ -0,0 +1,165 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import time
+
+from Model.AnnealingAlgorithm import anneal_solve
+from Model.BaselineAlgorithm import FIFOSchedule, CompactFIFOSchedule
+from Model.CompactSchedule import CompactSchedule
+from Model.CSPAlgorithm import csp_solve
+from Model.FlowAlgorithm import flow_solve
+from Model.GeneticAlgorithm import GeneticAlgorithm
+from Model.Schedule import Schedule
+from Model.SyntheticCamp import AGE_MIX, synthetic_configuration, synthetic_frame
+from main import MODELS, calculate_satisfaction_rate, calculate_utilization
+
+
+SIZES = [100, 1000, 10000, 100000]
+
+
+def peak_memory_mb():
+    # Peak resident set size of this process (ru_maxrss is in KB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if os.uname().sysname == 'Darwin' else peak / 1024
+
+
+def solve(model, configuration, args):
+    if model == 'base-line':
+        return CompactFIFOSchedule(configuration) if args.compact else FIFOSchedule(configuration)
+    schedule_cls = CompactSchedule if args.compact else Schedule
+    if model == 'genetic':
+        ga = GeneticAlgorithm(configuration, population_size=args.population, generations=args.generations,
+                              schedule_cls=schedule_cls, seed=args.seed)
+        ga.run()
+        return ga.best_schedule
+    if model == 'flow':
+        return flow_solve(configuration, schedule_cls)[0]
+    if model == 'annealing':
+        return anneal_solve(configuration, schedule_cls, args.time_limit)[0]
+    return csp_solve(configuration, schedule_cls)[0]
+
+
+def run_case(model, campers, args, connection):
+    # Runs in its own process, so the peak memory belongs to this case alone
+    configuration = synthetic_configuration(campers, args.workshops, args.age_mix, args.skew, args.seed)
+    configuration['workshops']['-'] = {'age_group': None, 'name': '-'}
+    memory_before = peak_memory_mb()
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        schedule = solve(model, configuration, args)
+        wall_time = time.perf_counter() - start
+        satisfaction = calculate_satisfaction_rate(configuration, schedule)
+        try:
+            utilization = calculate_utilization(schedule)
+        except ZeroDivisionError:
+            utilization = 0.0  # No session was opened
+
+    connection.send({
+        'wall_time': wall_time,
+        'peak_memory_mb': peak_memory_mb(),
+        'solve_memory_mb': peak_memory_mb() - memory_before,
+        'satisfaction': satisfaction,
+        'satisfaction_per_camper': satisfaction / campers,
+        'utilization': utilization,
+        'fully_scheduled': schedule.fully_scheduled,
+    })
+
+
+def benchmark(args):
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for campers in args.sizes:
+        for model in args.models:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=run_case, args=(model, campers, args, sender))
+            process.start()
+            sender.close()
+            result = {'model': model, 'campers': campers, 'status': 'timeout'}
+            if receiver.poll(args.timeout):
+                try:
+                    result.update(receiver.recv(), status='ok')
+                except EOFError:
+                    result['status'] = 'failed'  # The process died before reporting (error or out of memory)
+            process.terminate()
+            process.join()
+            results.append(result)
+
+            if result['status'] == 'ok':
+                print(f"{model:>9} {campers:>7} campers: {result['wall_time']:9.2f}s "
+                      f"{result['peak_memory_mb']:8.1f}MB peak, satisfaction {result['satisfaction']}, "
+                      f"utilization {result['utilization']:.2f}%")
+            else:
+                print(f"{model:>9} {campers:>7} campers: {result['status']}")
+    return results
+
+
+def plot_scaling(results, models, file_path):
+    import matplotlib.pyplot as plt
+
+    metrics = [('wall_time', 'Wall time (s)', True), ('peak_memory_mb', 'Peak memory (MB)', True),
+               ('satisfaction_per_camper', 'Satisfaction per camper', False), ('utilization', 'Utilization (%)', False)]
+    fig, axes = plt.subplots(2, 2, figsize=(12, 9))
+    for ax, (metric, label, log_scale) in zip(axes.flat, metrics):
+        for model in models:
+            points = [(result['campers'], result[metric]) for result in results
+                      if result['model'] == model and result['status'] == 'ok']
+            if points:
+                ax.plot(*zip(*points), marker='o', label=model)
+        ax.set_xscale('log')
+        if log_scale:
+            ax.set_yscale('log')
+        ax.set_xlabel('Campers')
+        ax.set_ylabel(label)
+        ax.grid(True, which='both', alpha=0.3)
+        ax.legend()
+    fig.tight_layout()
+    plt.savefig(file_path, bbox_inches='tight')
+
+
+def main():
+    parser = argparse.ArgumentParser("Benchmark every model on synthetic camps of growing size")
+    parser.add_argument("-m", "--models", nargs='+', default=MODELS, choices=MODELS, help="models to run")
+    parser.add_argument("--sizes", nargs='+', type=int, default=SIZES, help="camper counts to run")
+    parser.add_argument("--workshops", type=int, default=36, help="workshops in each synthetic camp")
+    parser.add_argument("--age-mix", nargs=4, type=float, default=AGE_MIX,
+                        help="weights of Nanobyte, Kilobyte, Megabyte and Gigabyte campers")
+    parser.add_argument("--skew", type=float, default=0.7, help="workshop popularity skew (0 is uniform)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic camps and the genetic model")
+    parser.add_argument("--generations", type=int, default=50, help="generations of the genetic model")
+    parser.add_argument("--population", type=int, default=20, help="population size of the genetic model")
+    parser.add_argument("--time-limit", type=float, default=10.0, help="seconds the annealing model searches for")
+    parser.add_argument("-c", "--compact", action="store_true", help="use the compact array-backed schedule")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds before a single run is abandoned")
+    parser.add_argument("--output", default="Results/benchmark.json", help="machine-readable results file")
+    parser.add_argument("--plot", default="Results/benchmark.pdf", help="scaling curves (empty to skip)")
+    parser.add_argument("--write-data", metavar="DIR", help="also save each synthetic camp as a CSV main.py can read")
+    args = parser.parse_args()
+
+    if args.workshops < 4:
+        print("workshops should be at least 4, one per selection")
+        return
+
+    if args.write_data:
+        os.makedirs(args.write_data, exist_ok=True)
+        for campers in args.sizes:
+            synthetic_frame(campers, args.workshops, args.age_mix, args.skew, args.seed).to_csv(
+                os.path.join(args.write_data, f'synthetic_{campers}_campers.csv'), index=False)
+
+    results = benchmark(args)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as file:
+        json.dump({'settings': {key: value for key, value in vars(args).items()}, 'results': results}, file, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.plot:
+        plot_scaling(results, args.models, args.plot)
+        print(f"scaling curves written to {args.plot}")
+
+
+if __name__ == '__main__':
+    main()
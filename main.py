@@ -1,49 +1,60 @@
 import sys
-import numpy as np
-import pandas as pd
+import random
 import argparse
-import matplotlib.pyplot as plt
 import os
-
-from Model.BaselineAlgorithm import FIFOSchedule
-from Model.GeneticAlgorithm import GeneticAlgorithm
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Model.BaselineAlgorithm import FIFOSchedule, CompactFIFOSchedule
+from Model import Metrics
+from Model.CampData import CHUNK_SIZE, NAME_COLUMN, is_stream_file, load_camp_data, load_configuration_from_stream, \
+    read_camper_chunks
+from Model.CampIndex import AGE_GROUP_KEYS, age_bucket
+from Model.CompactSchedule import CompactSchedule
+from Model.ScheduleExport import EXPORT_FORMATS, TIME_SLOTS, camper_columns, export_schedule
+from Model.GeneticAlgorithm import GeneticAlgorithm, checkpoint_run_seed
 from Model.CSPAlgorithm import csp_solve
-
-
-MODELS = ['csp', 'base-line', 'genetic']
-
-
-def load_configuration_from_excel(file_path, samples):
-    # Load camper data from Excel
-    sheet_data = pd.read_excel(file_path, sheet_name='Sheet1')
-
-    num_rows = sheet_data.shape[0]
+from Model.FlowAlgorithm import flow_solve
+from Model.AnnealingAlgorithm import anneal_solve
+from Model.Schedule import Schedule
+
+
+MODELS = ['csp', 'base-line', 'genetic', 'flow', 'annealing']
+# Optional output stages: schedule PDF, configuration print, schedule print, session bookings print,
+# per-camper tables and the Results/camp_schedule.txt overview
+ARTIFACTS = ['plot', 'config', 'schedule', 'booking', 'tables', 'overview']
+# What each model produces when --outputs is not given
+MODEL_OUTPUTS = {
+    'base-line': ['plot', 'config', 'schedule', 'booking'],
+    'csp': ['plot', 'config', 'schedule'],
+    'genetic': ['plot', 'config', 'schedule', 'tables', 'overview'],
+    'flow': ['plot', 'config', 'schedule'],
+    'annealing': ['plot', 'config', 'schedule'],
+}
+
+
+def load_configuration_from_excel(file_path, samples, camp_data=None):
+    # Load camper data from the Excel sheet, or from its cached encoding when it is unchanged
+    if camp_data is None:
+        camp_data = load_camp_data(file_path)
+
+    num_rows = len(camp_data)
     if samples > num_rows:
         print(f"samples need to be between 100 to {num_rows}")
         sys.exit()
 
-    sheet_data = sheet_data.sample(n=samples)
-
-    # Initialize the configuration dictionary
-    configuration = {'campers': {}, 'workshops': {}}
+    # Sample in memory and build the configuration dictionary from the sampled rows
+    return camp_data.configuration(camp_data.sample(samples))
 
-    # Process each row to populate the configuration dictionary
-    for _, row in sheet_data.iterrows():
-        camper_name = row['Camper\'s name']
-        age_group = row['Age Unit']
-        preferences = [row['Selection #1'], row['Selection #2'], row['Selection #3'], row['Selection #4']]
 
-        # Add camper details to the dictionary
-        configuration['campers'][camper_name] = {
-            'age_group': age_group,
-            'preferences': preferences
-        }
-
-        # Add workshop details
-        for preference in preferences:
-            if preference and preference not in configuration['workshops']:
-                configuration['workshops'][preference] = {'name': preference, 'age_group': None}
+def load_configuration(file_path, samples, camp_data=None, chunk_size=CHUNK_SIZE):
+    # CSV / JSON-lines exports are streamed in chunks, Excel sheets go through the cached encoding
+    if not is_stream_file(file_path):
+        return load_configuration_from_excel(file_path, samples, camp_data)
 
+    configuration, num_rows = load_configuration_from_stream(file_path, samples, chunk_size)
+    if samples > num_rows:
+        print(f"samples need to be between 100 to {num_rows}")
+        sys.exit()
     return configuration
 
 
@@ -72,7 +83,7 @@ def check_constraints(schedule, configuration):
         camper_age_group = configuration['campers'][camper_id]['age_group']
         for workshop, slot in workshops:
             if workshop != "-":
-                session_age_group = 'young' if camper_age_group in schedule.young_group else 'old'
+                session_age_group = AGE_GROUP_KEYS[age_bucket(camper_age_group)]
                 workshop_camper_list = schedule.session_bookings[workshop][slot][session_age_group]
                 if camper_id not in workshop_camper_list:
                     age_group_errors.append(
@@ -120,56 +131,41 @@ def print_non_preferred_workshops(schedule, configuration):
     print()  # Empty line between print assignments
 
 
+@Metrics.timed('export')
 def print_clear_schedule_overview(schedule, file_path):
     # Define the time slots
     time_slots = ['9:00 AM - 12:00 PM', '1:00 PM - 3:00 PM', '3:00 PM - 6:00 PM']
 
-    # Initialize the structure to hold workshop information for each session
-    session_data = {slot: {'Young': [], 'Old': []} for slot in time_slots}
-
-    # Fill in the session data with workshops, capacities, and campers
+    # Lines of each (slot, age group) section, filled in one pass over the bookings and written with one call
+    sections = {(slot, age_group_key): [] for slot in range(len(time_slots)) for age_group_key in ('young', 'old')}
     for workshop, slots in schedule.session_bookings.items():
         for slot_idx, age_groups in slots.items():
             if slot_idx >= len(time_slots):
                 print(f"Warning: Slot index {slot_idx} is out of range. Skipping this slot.")
                 continue  # Skip invalid slots
 
-            # Process each age group
             for age_group_key, campers in age_groups.items():
                 if len(campers) == 0:
                     continue  # Skip sessions with zero campers
+                lines = sections[slot_idx, age_group_key]
+                lines.append(f"    - {workshop} ({len(campers)}/15):\n")
+                lines.extend(f"        {i + 1}. {camper}\n" for i, camper in enumerate(campers))
 
-                # Prepare the list of campers in this workshop and session
-                camper_list = "\n        ".join(f"{i + 1}. {camper}" for i, camper in enumerate(campers))
-                capacity = f"{len(campers)}/15"
-                session_data[time_slots[slot_idx]][age_group_key.capitalize()].append(
-                    f"{workshop} ({capacity}):\n        {camper_list}")
+    output = []
+    for idx, slot in enumerate(time_slots):
+        output.append(f"Session {idx + 1} ({slot}):\n")
+        for age_group_key, title in (('young', 'Young Group'), ('old', 'Older Group')):
+            output.append(f"  {title}:\n")
+            output.extend(sections[idx, age_group_key] or ["    No Workshops\n"])
+        output.append("\n" + "-" * 60 + "\n")
 
     # Write the schedule to a file
     with open(file_path, 'w') as file:
-        for idx, slot in enumerate(time_slots):
-            file.write(f"Session {idx + 1} ({slot}):\n")
-
-            # Write Young Group Workshops
-            file.write("  Young Group:\n")
-            if session_data[slot]['Young']:
-                for workshop in session_data[slot]['Young']:
-                    file.write(f"    - {workshop}\n")
-            else:
-                file.write("    No Workshops\n")
+        file.write("".join(output))
 
-            # Write Older Group Workshops
-            file.write("  Older Group:\n")
-            if session_data[slot]['Old']:
-                for workshop in session_data[slot]['Old']:
-                    file.write(f"    - {workshop}\n")
-            else:
-                file.write("    No Workshops\n")
 
-            file.write("\n" + "-" * 60 + "\n")
-
-
-def plot_schedule_overview(schedule, configuration, schedule_type):
+def schedule_snapshot(schedule):
+    # What the PDF shows, without the campers: time slot -> {'Young': [...], 'Old': [...]} of "workshop (n/15)"
     # Define the time slots
     time_slots = ['9:00 AM - 12:00 PM', '1:00 PM - 3:00 PM', '3:00 PM - 6:00 PM']
 
@@ -185,6 +181,16 @@ def plot_schedule_overview(schedule, configuration, schedule_type):
                 if len(campers) > 0:
                     capacity = f"{len(campers)}/15"
                     session_data[time_slots[slot_idx]][age_group_key.capitalize()].append(f"{workshop} ({capacity})")
+    return session_data
+
+
+def render_schedule_overview(session_data, file_path):
+    # matplotlib is only imported by runs that plot; the PDF backend needs no display
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    time_slots = list(session_data)
 
     # Determine the maximum number of workshops in any session for dynamic sizing
     max_workshops = max(
@@ -225,32 +231,91 @@ def plot_schedule_overview(schedule, configuration, schedule_type):
             cell.set_height(0.15)  # Set a higher height for header
         cell.set_height(row_height)
 
-    # Save the plot based on the 'fifo' flag
-    plt.savefig(f"{schedule_type} camp schedule.pdf", bbox_inches='tight', dpi=300)
-
-
+    plt.savefig(file_path, bbox_inches='tight', dpi=300)
+    plt.close(fig)
+    return file_path
+
+
+def plot_file_name(schedule_type, iteration=0, iterations=1):
+    return iteration_path(f"{schedule_type} camp schedule.pdf", iteration, iterations)
+
+
+class ScheduleRenderer:
+    # Renders schedule PDFs in a background process from snapshots (see schedule_snapshot), so solving never waits
+    # for matplotlib. Which iterations are rendered:
+    #   'all'  - every iteration, submitted as soon as it finishes
+    #   'last' - only the final iteration
+    #   'best' - only the iteration with the highest satisfaction (the first one on ties), once all have finished
+    def __init__(self, which, iterations):
+        self.which = which
+        self.iterations = iterations
+        self.pool = None
+        self.futures = []
+        self.best = None  # (satisfaction, iteration, schedule_type, snapshot)
+
+    def add(self, iteration, satisfaction, schedule_type, snapshot):
+        if self.which == 'all' or (self.which == 'last' and iteration == self.iterations - 1):
+            self.submit(iteration, schedule_type, snapshot)
+        elif self.which == 'best' and (self.best is None or (satisfaction, -iteration) > (self.best[0], -self.best[1])):
+            self.best = (satisfaction, iteration, schedule_type, snapshot)
+
+    def submit(self, iteration, schedule_type, snapshot):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=1)
+        self.futures.append(self.pool.submit(render_schedule_overview, snapshot,
+                                             plot_file_name(schedule_type, iteration, self.iterations)))
+
+    def close(self):
+        # Wait for the queued PDFs; returns their file names
+        if self.best is not None:
+            self.submit(*self.best[1:])
+            self.best = None
+        if self.pool is None:
+            return []
+        file_names = [future.result() for future in self.futures]
+        self.pool.shutdown()
+        return file_names
+
+
+@Metrics.timed('export')
 def generate_personalized_tables(schedule):
-    for camper_id, workshops in schedule.schedule.items():
-        data = {
-            'Time Slot': ['Slot 1 (9:00 AM - 12:00 PM)', 'Slot 2 (1:00 PM - 3:00 PM)', 'Slot 3 (3:00 PM - 6:00 PM)'],
-            'Workshop': [None, None, None]
-        }
-        for workshop, slot in workshops:
-            data['Workshop'][slot] = workshop
-
-        camper_schedule_df = pd.DataFrame(data)
-        print(f"Schedule for Camper: {camper_id}")
-        print(camper_schedule_df)
-        print("\n" + "-" * 30 + "\n")
-
-
-def run_fifo_schedule(configuration):
+    # The table pandas used to print for each camper, formatted from one pass over the schedule and written at once
+    # (pandas pads values by 2 and headers by 1 and right-aligns both)
+    columns = camper_columns(schedule)
+    slot_width = max(len('Time Slot') + 1, max(map(len, TIME_SLOTS)) + 2)
+    lines = []
+    for camper_id, *workshops in zip(columns[NAME_COLUMN], *(columns[slot] for slot in TIME_SLOTS)):
+        workshops = [str(workshop) for workshop in workshops]
+        workshop_width = max(len('Workshop') + 1, max(map(len, workshops)) + 2)
+        lines.append(f"Schedule for Camper: {camper_id}")
+        lines.append(f" {'Time Slot':>{slot_width}}{'Workshop':>{workshop_width}}")
+        for i, (slot, workshop) in enumerate(zip(TIME_SLOTS, workshops)):
+            lines.append(f"{i}{slot:>{slot_width}}{workshop:>{workshop_width}}")
+        lines.append("\n" + "-" * 30 + "\n")
+    sys.stdout.write("".join(line + "\n" for line in lines))
+
+
+def write_outputs(schedule, configuration, schedule_type, outputs):
+    # The optional output stages picked by --outputs, in the order the models always produced them; 'plot' is drawn
+    # by main's ScheduleRenderer
+    if 'schedule' in outputs:
+        with Metrics.phase('export'):
+            print(schedule)  # Print the generated schedule
+    if 'booking' in outputs:
+        with Metrics.phase('export'):
+            schedule.print_booking()
+    if 'overview' in outputs:
+        print_clear_schedule_overview(schedule, 'Results/camp_schedule.txt')
+    if 'tables' in outputs:
+        generate_personalized_tables(schedule)
+
+
+def run_fifo_schedule(configuration, compact=False, outputs=MODEL_OUTPUTS['base-line']):
     schedule_type = 'FIFO Algorithm'
     print("Running FIFO Scheduling Algorithm...\n")
-    fifo_schedule = FIFOSchedule(configuration)
-    print(fifo_schedule)  # Print the generated schedule
-    plot_schedule_overview(fifo_schedule, configuration, schedule_type)
-    fifo_schedule.print_booking()
+    with Metrics.phase('solve'):
+        fifo_schedule = CompactFIFOSchedule(configuration) if compact else FIFOSchedule(configuration)
+    write_outputs(fifo_schedule, configuration, schedule_type, outputs)
 
     return fifo_schedule, schedule_type
 
@@ -262,20 +327,38 @@ def run_fifo_schedule(configuration):
     # print(f"completion rate: {calculate_completion_rate(fifo_schedule)}")
 
 
-def run_genetic_schedule(configuration):
+def run_fifo_stream(file_path, chunk_size=CHUNK_SIZE, outputs=MODEL_OUTPUTS['base-line']):
+    # FIFO assigns every camper on arrival, so campers are scheduled chunk by chunk while the file streams in
+    schedule_type = 'FIFO Algorithm'
+    print("Running FIFO Scheduling Algorithm on the streamed campers...\n")
+    configuration = {'campers': {}, 'workshops': {'-': {'age_group': None, 'name': '-'}}}
+    fifo_schedule = FIFOSchedule(configuration)
+    with Metrics.phase('solve'):  # Reading the file is interleaved with the assignments, so it counts here
+        for chunk in read_camper_chunks(file_path, chunk_size):
+            fifo_schedule.add_campers(chunk)
+    write_outputs(fifo_schedule, configuration, schedule_type, outputs)
+
+    return fifo_schedule, schedule_type
+
+
+def run_genetic_schedule(configuration, compact=False, workers=1, crossover_mode='rebuild',
+                         outputs=MODEL_OUTPUTS['genetic'], warm_start=0.0, perturbation=0.05, local_search=0.0,
+                         checkpoint=None, checkpoint_interval=0, resume=False, run_seed=None):
     schedule_type = 'Genetic Algorithm'
     # Create and run the genetic algorithm
-    ga = GeneticAlgorithm(configuration)
-    ga.run()
+    with Metrics.phase('solve'):
+        ga = GeneticAlgorithm(configuration, schedule_cls=CompactSchedule if compact else Schedule, workers=workers,
+                              crossover_mode=crossover_mode, warm_start=warm_start, perturbation=perturbation,
+                              local_search=local_search, checkpoint=checkpoint,
+                              checkpoint_interval=checkpoint_interval, resume=resume, run_seed=run_seed)
+        ga.run()
 
     # Get the best schedule from the GA result
     best_schedule = ga.best_schedule
 
     print("Running Genetic Scheduling Algorithm...\n")
-    # Print results
-    print("Best schedule found:")
-    print(best_schedule)
-    print()  # Empty line
+    if 'schedule' in outputs:
+        print("Best schedule found:")
 
     # Print non-preferred workshops
     # print_non_preferred_workshops(best_schedule, configuration)
@@ -283,9 +366,7 @@ def run_genetic_schedule(configuration):
     # Check constraints for the best schedule
     # check_constraints(best_schedule, configuration)
 
-    plot_schedule_overview(best_schedule, configuration, schedule_type)
-    print_clear_schedule_overview(best_schedule, 'Results/camp_schedule.txt')
-    generate_personalized_tables(best_schedule)
+    write_outputs(best_schedule, configuration, schedule_type, outputs)
 
     # TODO: UNMUTE
     # best_schedule.print_booking()
@@ -298,13 +379,13 @@ def run_genetic_schedule(configuration):
     return best_schedule, schedule_type
 
 
-def run_csp_schedule(configuration):
+def run_csp_schedule(configuration, compact=False, propagate=False, max_backtracks=3, outputs=MODEL_OUTPUTS['csp']):
     # Create and run the genetic algorithm
-    schedule, schedule_type = csp_solve(configuration)
+    with Metrics.phase('solve'):
+        schedule, schedule_type = csp_solve(configuration, CompactSchedule if compact else Schedule, propagate,
+                                            max_backtracks)
     print("Running CSP Scheduling Algorithm...\n")
-    print(schedule)
-
-    plot_schedule_overview(schedule, configuration, schedule_type)
+    write_outputs(schedule, configuration, schedule_type, outputs)
 
     # TODO: UNMUTE
     # best_schedule.print_booking()
@@ -317,6 +398,24 @@ def run_csp_schedule(configuration):
     return schedule, schedule_type
 
 
+def run_flow_schedule(configuration, compact=False, outputs=MODEL_OUTPUTS['flow']):
+    with Metrics.phase('solve'):
+        schedule, schedule_type = flow_solve(configuration, CompactSchedule if compact else Schedule)
+    print("Running Flow Scheduling Algorithm...\n")
+    write_outputs(schedule, configuration, schedule_type, outputs)
+
+    return schedule, schedule_type
+
+
+def run_annealing_schedule(configuration, compact=False, time_limit=10.0, outputs=MODEL_OUTPUTS['annealing']):
+    with Metrics.phase('solve'):
+        schedule, schedule_type = anneal_solve(configuration, CompactSchedule if compact else Schedule, time_limit)
+    print("Running Simulated Annealing Scheduling Algorithm...\n")
+    write_outputs(schedule, configuration, schedule_type, outputs)
+
+    return schedule, schedule_type
+
+
 def calculate_completion_rate(schedule):
     total_campers = len(schedule.schedule)
     fully_scheduled = sum(
@@ -325,6 +424,7 @@ def calculate_completion_rate(schedule):
     return f"{fully_scheduled} out of {total_campers} campers ({percentages:.2f}%) where fully scheduled"
 
 
+@Metrics.timed('score')
 def calculate_utilization(schedule):
     small_workshops = 0
     total_workshops = 0
@@ -342,6 +442,7 @@ def calculate_utilization(schedule):
     return (1 - (small_workshops / total_workshops)) * 100
 
 
+@Metrics.timed('score')
 def calculate_satisfaction_rate(prefrences, schedule):
     satisfaction_counts = {0: 0, 1: 0, 2: 0, 3: 0}
     for camper_name, workshops in schedule.schedule.items():
@@ -374,71 +475,278 @@ def validate_arguments(args):
     if args.iterations < 1:
         print("num of iterations should be at least 1")
         is_valid = False
+    if args.workers < 1:
+        print("num of workers should be at least 1")
+        is_valid = False
+    if args.backtracks < 0:
+        print("num of backtracks should be at least 0")
+        is_valid = False
+    if args.chunk_size < 1:
+        print("chunk size should be at least 1")
+        is_valid = False
+    if args.jobs < 1:
+        print("num of jobs should be at least 1")
+        is_valid = False
+    if not 0 <= args.warm_start <= 1 or not 0 <= args.perturbation <= 1:
+        print("warm start and perturbation should be fractions between 0 and 1")
+        is_valid = False
+    if args.local_search < 0:
+        print("local search budget should not be negative")
+        is_valid = False
+    if args.time_limit <= 0:
+        print("annealing time limit should be positive")
+        is_valid = False
+    if args.checkpoint_every < 0:
+        print("checkpoint interval should not be negative")
+        is_valid = False
+    if args.export and not args.export.lower().endswith(EXPORT_FORMATS):
+        print(f"export file should end with one of {EXPORT_FORMATS}")
+        is_valid = False
     return is_valid
 
 
-def main():
+class RunningStats:
+    # Mean and (population) std updated one value at a time (Welford), so results can be reported as they arrive
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
 
-    parser = argparse.ArgumentParser("A simple argument parser")
-    # file path
-    parser.add_argument("filename", help="name of the file to process")
-    # model [base-line, csp, genetic]
-    parser.add_argument("-m", "--model", type=str, default="base-line", help="model to run base-line/csp/genetic")
-    # samples [50... data size]
-    parser.add_argument("-s", "--samples", type=int, default=-1, help="samples to take from file between 50 to all")
-    # iterations
-    parser.add_argument("-i", "--iterations", type=int, default=1, help="how many iterations to run")
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
 
-    args = parser.parse_args()
+    @property
+    def std(self):
+        return (self.m2 / self.count) ** 0.5 if self.count else 0.0
 
-    if not validate_arguments(args):
-        return
 
-    file_path = args.filename
+def iteration_path(file_path, iteration, iterations):
+    # file.ext for a single iteration, file_<iteration>.ext (1-based) when there are several
+    if iterations == 1:
+        return file_path
+    root, extension = os.path.splitext(file_path)
+    return f"{root}_{iteration + 1}{extension}"
+
+
+def run_iteration(args, camp_data, seed, iteration=0):
+    # One independent sample / solve / score round; returns (satisfaction, utilization, metrics, plot), where plot is
+    # (schedule type, snapshot) for the ScheduleRenderer when the plot stage is on
+    import numpy as np
 
-    satisfaction_rate_lst = []
-    utilization_rate_lst = []
+    if args.metrics_out:
+        Metrics.enable()  # Pool processes do not inherit it when they are spawned rather than forked
+    random.seed(seed)
+    np.random.seed(seed)
+    file_path = args.filename
+    # The baseline can schedule a whole streamed file without holding a separate configuration first
+    stream_fifo = camp_data is None and args.model == 'base-line' and args.samples < 0 and not args.compact
 
-    for i in range(args.iterations):
+    if not stream_fifo:
         # configuration = load_configuration_from_excel(file_path)
-        configuration = load_configuration_from_excel(file_path, args.samples)
+        with Metrics.phase('load'):
+            configuration = load_configuration(file_path, args.samples, camp_data, args.chunk_size)
         configuration['workshops']['-'] = {'age_group': None, 'name': '-'}
         data_size = len(configuration['campers'])
 
         # Print the configuration
-        print("Configuration Loaded:")
-        print(configuration)
+        if 'config' in args.outputs:
+            with Metrics.phase('export'):
+                print("Configuration Loaded:")
+                print(configuration)
         print(f"Number of campers in configuration: {len(configuration['campers'])}")
 
-        if args.model == 'base-line':
-            # Run FIFO scheduling
-            schedule = run_fifo_schedule(configuration)
+    if stream_fifo:
+        # Run FIFO scheduling while the file streams in
+        schedule = run_fifo_stream(file_path, args.chunk_size, args.outputs)
+        configuration = schedule[0].configuration
+
+    elif args.model == 'base-line':
+        # Run FIFO scheduling
+        schedule = run_fifo_schedule(configuration, args.compact, args.outputs)
+
+    elif args.model == 'genetic':
+        # Run Genetic scheduling
+        schedule = run_genetic_schedule(configuration, args.compact, args.workers, args.crossover, args.outputs,
+                                        args.warm_start, args.perturbation, args.local_search,
+                                        iteration_path(args.checkpoint, iteration, args.iterations),
+                                        args.checkpoint_every, args.resume, args.seed)
+
+    elif args.model == 'flow':
+        # Run min-cost flow scheduling
+        schedule = run_flow_schedule(configuration, args.compact, args.outputs)
+
+    elif args.model == 'annealing':
+        # Run simulated annealing from the FIFO schedule
+        schedule = run_annealing_schedule(configuration, args.compact, args.time_limit, args.outputs)
+
+    else:
+        # Run CSP scheduling
+        schedule = run_csp_schedule(configuration, args.compact, args.propagate, args.backtracks, args.outputs)
+
+    satisfaction_rate = calculate_satisfaction_rate(configuration, schedule[0])
+    utilization_score = calculate_utilization(schedule[0])
+
+    if args.export:
+        with Metrics.phase('export'):
+            export_schedule(schedule[0], iteration_path(args.export, iteration, args.iterations))
+
+    plot = None
+    if 'plot' in args.outputs:
+        with Metrics.phase('plot'):
+            plot = (schedule[1], schedule_snapshot(schedule[0]))
+    return satisfaction_rate, utilization_score, Metrics.drain(), plot
+
+
+def run_iterations(args, camp_data, seeds):
+    # Yields (iteration, result) as iterations finish, in a pool of --jobs processes when asked for
+    if args.jobs == 1:
+        for i, seed in enumerate(seeds):
+            yield i, run_iteration(args, camp_data, seed, i)
+        return
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(run_iteration, args, camp_data, seed, i): i for i, seed in enumerate(seeds)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def main():
+
+    parser = argparse.ArgumentParser("A simple argument parser")
+    # file path
+    parser.add_argument("filename", help="name of the file to process")
+    # model [base-line, csp, genetic, flow, annealing]
+    parser.add_argument("-m", "--model", type=str, default="base-line",
+                        help="model to run base-line/csp/genetic/flow/annealing")
+    # samples [50... data size]
+    parser.add_argument("-s", "--samples", type=int, default=-1, help="samples to take from file between 50 to all")
+    # iterations
+    parser.add_argument("-i", "--iterations", type=int, default=1, help="how many iterations to run")
+    # compact array-backed schedules
+    parser.add_argument("-c", "--compact", action="store_true", help="use the compact array-backed schedule")
+    # worker processes for the genetic model
+    parser.add_argument("-w", "--workers", type=int, default=1, help="processes used to breed the genetic model")
+    # crossover engine for the genetic model [rebuild, delta]
+    parser.add_argument("--crossover", type=str, default="rebuild", choices=["rebuild", "delta"],
+                        help="rebuild children from scratch or only exchange the genes where the parents differ")
+    # initial genetic population partly seeded from the base-line and csp schedules
+    parser.add_argument("--warm-start", type=float, default=0.0,
+                        help="fraction of the genetic population seeded from perturbed base-line / csp schedules")
+    parser.add_argument("--perturbation", type=float, default=0.05,
+                        help="fraction of campers moved in each seeded schedule")
+    # memetic local search on the best genetic individuals
+    parser.add_argument("--local-search", type=float, default=0.0, metavar="SECONDS",
+                        help="seconds of relocate / swap hill climbing on the genetic elite per generation")
+    # periodic checkpoints of the genetic model, and resuming from them
+    parser.add_argument("--checkpoint", type=str, default="Results/genetic_checkpoint.pkl",
+                        help="checkpoint file of the genetic model")
+    parser.add_argument("--checkpoint-every", type=int, default=0, metavar="GENERATIONS",
+                        help="save the genetic model's state every that many generations (0 never)")
+    parser.add_argument("--resume", action="store_true", help="continue the genetic model from its checkpoint")
+    # wall-clock budget of the annealing model
+    parser.add_argument("-t", "--time-limit", type=float, default=10.0, metavar="SECONDS",
+                        help="seconds the annealing model searches for")
+    # forward checking for the csp model
+    parser.add_argument("-p", "--propagate", action="store_true",
+                        help="propagate every csp booking and backtrack on domain wipe-outs")
+    parser.add_argument("-b", "--backtracks", type=int, default=3, help="max backtracks per camper with --propagate")
+    # independent iterations run in parallel, each with its own seed
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="processes used to run iterations in parallel")
+    parser.add_argument("--seed", type=int, default=None, help="seed the iterations' seeds are drawn from")
+    # campers parsed per chunk when streaming csv / jsonl files
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="campers read per chunk from csv/jsonl files")
+    # phase timings and hot-path counters
+    parser.add_argument("--metrics-out", type=str, default=None, help="write run metrics to this json file")
+    # optional output stages
+    parser.add_argument("-o", "--outputs", nargs='*', choices=ARTIFACTS, default=None,
+                        help="output stages to produce (default: the model's usual ones)")
+    parser.add_argument("--headless", action="store_true", help="skip every output stage not named in --outputs")
+    parser.add_argument("--plot-iterations", type=str, default="last", choices=["all", "last", "best"],
+                        help="iterations whose schedule PDF is rendered (in the background)")
+    # bulk export of every camper's schedule and the sessions
+    parser.add_argument("-e", "--export", nargs='?', const="Results/results.xlsx", default=None,
+                        help="export the schedule to a .csv, .xlsx or .json file (default Results/results.xlsx)")
 
-        elif args.model == 'genetic':
-            # Run Genetic scheduling
-            schedule = run_genetic_schedule(configuration)
+    args = parser.parse_args()
 
-        else:
-            # Run CSP scheduling
-            schedule = run_csp_schedule(configuration)
+    if not validate_arguments(args):
+        return
 
-        satisfaction_rate = calculate_satisfaction_rate(configuration, schedule[0])
-        utilization_score = calculate_utilization(schedule[0])
-        satisfaction_rate_lst.append(satisfaction_rate)
-        utilization_rate_lst.append(utilization_score)
+    file_path = args.filename
+    if args.outputs is None:
+        args.outputs = [] if args.headless else MODEL_OUTPUTS[args.model]
+    if args.metrics_out:
+        Metrics.enable()
+
+    # Parse an Excel file once, every iteration samples from the same encoded data
+    with Metrics.phase('load'):
+        camp_data = None if is_stream_file(file_path) else load_camp_data(file_path)
+    run_metrics = Metrics.drain()
+
+    # Every iteration gets its own seed, so a run can be repeated with --seed whatever --jobs is
+    if args.seed is None and args.resume and args.model == 'genetic':
+        # Without --seed, a resume continues the checkpoint's run, whose seed drew its campers
+        args.seed = checkpoint_run_seed(iteration_path(args.checkpoint, 0, args.iterations))
+    master_seed = args.seed if args.seed is not None else random.SystemRandom().getrandbits(32)
+    args.seed = master_seed  # Saved with the genetic model's checkpoints
+    seed_generator = random.Random(master_seed)
+    seeds = [seed_generator.getrandbits(32) for _ in range(args.iterations)]
+    print(f"seed: {master_seed}")
+
+    satisfaction_stats = RunningStats()
+    utilization_stats = RunningStats()
+    iteration_metrics = []
+    renderer = ScheduleRenderer(args.plot_iterations, args.iterations)
+    try:
+        for i, (satisfaction_rate, utilization_score, metrics, plot) in run_iterations(args, camp_data, seeds):
+            Metrics.merge(metrics, into=run_metrics)
+            if plot is not None:
+                renderer.add(i, satisfaction_rate, *plot)
+            iteration_metrics.append({'iteration': i + 1, 'seed': seeds[i], 'satisfaction': satisfaction_rate,
+                                      'utilization': utilization_score, **metrics})
+            satisfaction_stats.add(satisfaction_rate)
+            utilization_stats.add(utilization_score)
+            if args.iterations > 1:
+                print(f"iteration {i + 1} (seed {seeds[i]}): satisfaction {satisfaction_rate}, "
+                      f"utilization {utilization_score:.2f}% | {satisfaction_stats.count}/{args.iterations} done, "
+                      f"mean satisfaction {satisfaction_stats.mean:.2f}, "
+                      f"mean utilization {utilization_stats.mean:.2f}%")
+    except ValueError as error:
+        # A refused checkpoint or an invalid camper file
+        renderer.close()
+        print(error)
+        if args.resume:
+            print("a checkpoint can only be resumed with the --seed and sample it was written with")
+        return
 
     print("---------------------------------------------------------------")
-    if len(satisfaction_rate_lst) > 1:
+    if satisfaction_stats.count > 1:
         print(f'satisfaction rate: ')
-        print(f"mean value: {np.mean(satisfaction_rate_lst)}, std: {np.std(satisfaction_rate_lst):.2f}")
+        print(f"mean value: {satisfaction_stats.mean:.2f}, std: {satisfaction_stats.std:.2f}")
     else:
-        print(f"satisfaction rate: {satisfaction_rate_lst[0]}")
+        print(f"satisfaction rate: {satisfaction_rate}")
 
-    if len(utilization_rate_lst) > 1:
+    if utilization_stats.count > 1:
         print(f'utilization rate: ')
-        print(f"mean value: {np.mean(utilization_rate_lst):.2f}%, std: {np.std(utilization_rate_lst):.2f}")
+        print(f"mean value: {utilization_stats.mean:.2f}%, std: {utilization_stats.std:.2f}")
     else:
-        print(f"utilization rate: {utilization_rate_lst[0]:.2f}%")
+        print(f"utilization rate: {utilization_score:.2f}%")
+
+    # Wait for the schedule PDFs still being rendered
+    if 'plot' in args.outputs:
+        with Metrics.phase('plot'):
+            for file_name in renderer.close():
+                print(f"schedule plot written to {file_name}")
+        Metrics.merge(Metrics.drain(), into=run_metrics)
+
+    if args.metrics_out:
+        iteration_metrics.sort(key=lambda metrics: metrics['iteration'])
+        Metrics.write(args.metrics_out, {'model': args.model, 'seed': master_seed, **run_metrics,
+                                         'rates': Metrics.rates(run_metrics), 'iterations': iteration_metrics})
+        print(f"metrics written to {args.metrics_out}")
 
     # print('mean:')
     # print()
@@ -0,0 +1,43 @@
+from collections import Counter
+
+from Model.CampIndex import age_bucket
+
+
+def assert_consistent(schedule):
+    # The schedule's bookings, counters and running totals agree with its camper sessions, and every rule holds
+    configuration = schedule.configuration
+    campers = configuration['campers']
+    assert set(schedule.schedule) == set(campers)
+
+    seats = Counter()
+    fully_scheduled = satisfaction_score = 0
+    for camper_id, sessions in schedule.schedule.items():
+        camper = campers[camper_id]
+        workshops = [workshop for workshop, _ in sessions if workshop != "-"]
+        assert len(workshops) == len(set(workshops)), f"{camper_id} repeats a workshop"
+        assert sorted(slot for _, slot in sessions) == [0, 1, 2]
+        for workshop, slot in sessions:
+            if workshop != "-":
+                key = ('young', 'old')[age_bucket(camper['age_group'])]
+                assert schedule.is_booked(camper_id, workshop, slot, key)
+                seats[workshop, slot, key] += 1
+        fully_scheduled += len(workshops) == 3
+        satisfaction_score += sum(workshop in camper['preferences'] for workshop in workshops)
+
+    open_sessions = [0, 0, 0]
+    for workshop, slots in schedule.session_bookings.items():
+        for slot, age_groups in slots.items():
+            if workshop == "-":
+                continue
+            open_sessions[slot] += any(age_groups.values())
+            for key, members in age_groups.items():
+                assert len(members) == seats[workshop, slot, key]
+                assert len(members) <= schedule.max_slots_per_workshop
+            assert not (age_groups['young'] and age_groups['old']), f"{workshop} mixes age groups in slot {slot}"
+    # Random initial schedules book some '-' slots, which then hold a session of their own
+    for slot in range(3):
+        open_sessions[slot] += min(schedule.get_remain_sit("-", slot, group) for group in ('Nanobyte', 'Megabyte')) < \
+            schedule.max_slots_per_workshop
+    assert open_sessions == schedule.count_sessions_per_slot()
+    assert max(open_sessions) <= schedule.max_sessions_per_slot
+    assert (schedule.fully_scheduled, schedule.satisfaction_score) == (fully_scheduled, satisfaction_score)
@@ -0,0 +1,25 @@
+import random
+
+import numpy as np
+import pytest
+
+from Model.SyntheticCamp import synthetic_configuration
+
+
+def make_configuration(campers, seed=0):
+    # A synthetic camp in the shape main.py builds, '-' placeholder workshop included
+    configuration = synthetic_configuration(campers, seed=seed)
+    configuration['workshops']['-'] = {'age_group': None, 'name': '-'}
+    return configuration
+
+
+@pytest.fixture
+def configuration():
+    return make_configuration(200)
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    # Every test starts from the same random state, as main.py seeds each iteration
+    random.seed(0)
+    np.random.seed(0)
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from Model.BaselineAlgorithm import CompactFIFOSchedule, FIFOSchedule
+from Model.CSPAlgorithm import csp_solve
+from Model.CompactSchedule import CompactSchedule
+from Model.GeneticAlgorithm import GeneticAlgorithm
+from Model.Schedule import Schedule
+from tests.checks import assert_consistent
+
+
+def sessions_by_slot(schedule):
+    # Camper -> workshop per slot, whatever order the backend lists the sessions in
+    return {camper_id: tuple(workshop for workshop, _ in sorted(sessions, key=lambda session: session[1]))
+            for camper_id, sessions in schedule.schedule.items()}
+
+
+def assert_same_schedule(schedule, compact_schedule):
+    assert sessions_by_slot(compact_schedule) == sessions_by_slot(schedule)
+    assert compact_schedule.fingerprint == schedule.fingerprint
+    assert compact_schedule.count_sessions_per_slot() == schedule.count_sessions_per_slot()
+    assert_consistent(schedule)
+    assert_consistent(compact_schedule)
+
+
+def test_fifo(configuration):
+    assert_same_schedule(FIFOSchedule(configuration), CompactFIFOSchedule(configuration))
+
+
+@pytest.mark.parametrize('propagate', [False, True])
+def test_csp(configuration, propagate):
+    schedule, _ = csp_solve(configuration, Schedule, propagate)
+    compact_schedule, _ = csp_solve(configuration, CompactSchedule, propagate)
+    assert_same_schedule(schedule, compact_schedule)
+
+
+@pytest.mark.parametrize('crossover_mode', ['rebuild', 'delta'])
+def test_genetic(configuration, crossover_mode):
+    results = []
+    for schedule_cls in (Schedule, CompactSchedule):
+        random.seed(7)
+        ga = GeneticAlgorithm(configuration, population_size=12, generations=8, schedule_cls=schedule_cls,
+                              crossover_mode=crossover_mode, warm_start=0.25)
+        best = ga.run()
+        results.append((ga, best))
+    (ga, best), (compact_ga, compact_best) = results
+
+    assert_same_schedule(best, compact_best)
+    assert compact_ga.fitness(compact_best) == ga.fitness(best)
+    assert [individual.fingerprint for individual in compact_ga.population] == \
+           [individual.fingerprint for individual in ga.population]
+    for individual in compact_ga.population:
+        assert_consistent(individual)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Model.CampData import AGE_COLUMN, CACHE_SUFFIX, NAME_COLUMN, SELECTION_COLUMNS, SHEET_NAME, CampData, \
+    load_camp_data, load_configuration_from_stream
+from Model.Configuration import Configuration
+
+
+def frame(age_units):
+    rows = {NAME_COLUMN: [f'Camper {i}' for i in range(len(age_units))], AGE_COLUMN: age_units}
+    for column in SELECTION_COLUMNS:
+        rows[column] = [['Chess', 'Drama', np.nan][i % 3] for i in range(len(age_units))]
+    return pd.DataFrame(rows)
+
+
+def test_configuration_keeps_each_campers_age_unit():
+    configuration = CampData.from_frame(frame(['Kilobyte', 'Gigabyte', 'Kilobyte'])).configuration(slice(None))
+    assert [camper['age_group'] for camper in configuration['campers'].values()] == \
+           ['Kilobyte', 'Gigabyte', 'Kilobyte']
+    assert pd.isna(configuration['campers']['Camper 2']['preferences'][0])  # An empty selection stays NaN
+
+
+def test_missing_age_unit_is_refused():
+    with pytest.raises(ValueError, match='Camper 1'):
+        CampData.from_frame(frame(['Kilobyte', np.nan, 'Gigabyte']))
+
+
+def test_streamed_campers_are_shuffled_like_the_sheet(tmp_path):
+    # Without a sample size both inputs keep every camper in the same random order for the same seed
+    sheet = frame(['Kilobyte', 'Gigabyte', 'Megabyte'] * 10)
+    path = tmp_path / 'campers.csv'
+    sheet.to_csv(path, index=False)
+
+    camp_data = CampData.from_frame(sheet)
+    np.random.seed(7)
+    excel = camp_data.configuration(camp_data.sample(-1))
+    np.random.seed(7)
+    streamed, seen = load_configuration_from_stream(str(path), -1, chunk_size=7)
+    assert seen == len(sheet)
+    assert list(streamed['campers']) == list(excel['campers'])
+    assert list(excel['campers']) != list(sheet[NAME_COLUMN])
+
+
+def test_configuration_and_main_share_the_sheet_cache(tmp_path):
+    # Both readers ask for the same sheet, so the second one reuses the sidecar instead of rewriting it
+    path = tmp_path / 'campers.xlsx'
+    frame(['Kilobyte', 'Gigabyte', 'Megabyte']).to_excel(path, sheet_name=SHEET_NAME, index=False)
+    Configuration().parseFile(str(path))
+    cache = tmp_path / ('campers.xlsx' + CACHE_SUFFIX)
+    written = cache.stat().st_mtime_ns
+    assert list(load_camp_data(str(path)).names) == ['Camper 0', 'Camper 1', 'Camper 2']
+    assert cache.stat().st_mtime_ns == written
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from Model.CompactSchedule import CompactSchedule
+from Model.GeneticAlgorithm import GeneticAlgorithm, checkpoint_run_seed
+from Model.Schedule import Schedule
+from tests.checks import assert_consistent
+
+
+def run(configuration, checkpoint, resume=False, **settings):
+    ga = GeneticAlgorithm(configuration, population_size=10, generations=6, seed=None if resume else 1,
+                          checkpoint=str(checkpoint), checkpoint_interval=3, resume=resume, **settings)
+    best = ga.run()
+    return best, ga
+
+
+@pytest.mark.parametrize('schedule_cls', [Schedule, CompactSchedule])
+@pytest.mark.parametrize('workers', [1, 2])
+def test_resume_matches_an_uninterrupted_run(configuration, tmp_path, schedule_cls, workers):
+    # The checkpoint is written at generation 3; resuming from it must end where the run that wrote it ended
+    checkpoint = tmp_path / 'ga.pkl'
+    best, ga = run(configuration, checkpoint, schedule_cls=schedule_cls, workers=workers)
+    random.seed(12345)  # The generator state comes from the checkpoint, not from the caller
+    resumed_best, resumed_ga = run(configuration, checkpoint, resume=True, schedule_cls=schedule_cls,
+                                   workers=workers)
+    assert_consistent(resumed_best)
+    assert resumed_ga.fitness(resumed_best) == ga.fitness(best)
+    assert resumed_best.fingerprint == best.fingerprint
+    assert dict(resumed_best.schedule) == dict(best.schedule)
+
+
+def test_resume_refuses_other_settings(configuration, tmp_path):
+    checkpoint = tmp_path / 'ga.pkl'
+    run(configuration, checkpoint)
+    with pytest.raises(ValueError, match='crossover_mode'):
+        run(configuration, checkpoint, resume=True, crossover_mode='delta')
+
+
+def test_resume_with_local_search_warns(configuration, tmp_path, capsys):
+    checkpoint = tmp_path / 'ga.pkl'
+    run(configuration, checkpoint, local_search=0.001)
+    capsys.readouterr()
+    run(configuration, checkpoint, resume=True, local_search=0.001)
+    assert 'will not match an uninterrupted one' in capsys.readouterr().out
+
+
+def test_checkpoint_keeps_the_run_seed(configuration, tmp_path):
+    # main resumes a run started without --seed with the seed saved here, which drew the same campers
+    checkpoint = tmp_path / 'ga.pkl'
+    assert checkpoint_run_seed(str(checkpoint)) is None
+    run(configuration, checkpoint, run_seed=1234)
+    assert checkpoint_run_seed(str(checkpoint)) == 1234
+    other_campers = dict(configuration, campers=dict(list(configuration['campers'].items())[1:]))
+    with pytest.raises(ValueError, match='seed 1234 with different campers'):
+        run(other_campers, checkpoint, resume=True, run_seed=99)
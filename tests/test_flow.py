@@ -0,0 +1,25 @@
+import pytest
+
+from Model.CSPAlgorithm import csp_solve
+from Model.CompactSchedule import CompactSchedule
+from Model.FlowAlgorithm import flow_solve
+from Model.Schedule import Schedule
+from tests.checks import assert_consistent
+from tests.conftest import make_configuration
+from tests.test_backends import assert_same_schedule
+
+
+def test_flow_backends_agree(configuration):
+    assert_same_schedule(flow_solve(configuration, Schedule)[0], flow_solve(configuration, CompactSchedule)[0])
+
+
+@pytest.mark.parametrize('campers', [150, 400])
+def test_flow_seats_only_preferences_and_beats_plain_csp(campers):
+    configuration = make_configuration(campers, seed=campers)
+    schedule, _ = flow_solve(configuration)
+    assert_consistent(schedule)
+    for camper_id, sessions in schedule.schedule.items():
+        preferences = configuration['campers'][camper_id]['preferences']
+        assert all(workshop == "-" or workshop in preferences for workshop, _ in sessions)
+    csp_schedule, _ = csp_solve(configuration)
+    assert schedule.satisfaction_score >= csp_schedule.satisfaction_score
@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from Model.CompactSchedule import CompactSchedule
+from Model.GeneticAlgorithm import GeneticAlgorithm
+from Model.Schedule import Schedule
+from tests.checks import assert_consistent
+
+
+@pytest.mark.parametrize('schedule_cls', [Schedule, CompactSchedule])
+def test_delta_children_mutate_like_rebuilt_ones(configuration, schedule_cls):
+    # Rebuilt children carry no slot tracking, so a mutation may replace a booked slot; delta children must too
+    ga = GeneticAlgorithm(configuration, population_size=4, schedule_cls=schedule_cls)
+    campers = configuration['campers']
+    for child in ga.crossover(*ga.population[:2]) + ga.delta_crossover(*ga.population[2:]):
+        assert_consistent(child)
+        for camper_id, sessions in child.schedule.items():
+            for workshop, slot in sessions:
+                if workshop != "-":
+                    assert child.rejection_reason(camper_id, workshop, slot, campers[camper_id]['age_group']) != \
+                           'slot_taken'
+
+
+def evolve(configuration, schedule_cls, processes):
+    random.seed(3)
+    ga = GeneticAlgorithm(configuration, population_size=10, generations=4, schedule_cls=schedule_cls, workers=2)
+    ga.pool_size = lambda: processes
+    best = ga.run()
+    return ga.fitness(best), best.fingerprint
+
+
+@pytest.mark.parametrize('schedule_cls', [Schedule, CompactSchedule])
+def test_workers_breed_the_same_in_process_and_in_a_pool(configuration, schedule_cls):
+    # Without spare cores the seeded pairs are bred in-process, and must give what the pool gives
+    assert evolve(configuration, schedule_cls, 0) == evolve(configuration, schedule_cls, 2)
@@ -0,0 +1,91 @@
+import copy
+import random
+
+import pytest
+
+from Model import LocalSearch
+from Model.BaselineAlgorithm import FIFOSchedule
+from Model.CampIndex import CampIndex, get_index
+from Model.CompactSchedule import CompactSchedule
+from Model.Schedule import Schedule
+from tests.checks import assert_consistent
+
+
+INDEX_TABLES = ('camper_names', 'camper_ids', 'camper_age_buckets', 'camper_preferences', 'camper_preference_bits',
+                'camper_keys', 'workshop_ids')
+
+
+def sessions(schedule):
+    return {camper_id: list(camper_sessions) for camper_id, camper_sessions in schedule.schedule.items()}
+
+
+def assert_index_current(configuration):
+    # The index kept up to date by the late changes matches one built from scratch
+    live, fresh = get_index(configuration), CampIndex(configuration)
+    for table in INDEX_TABLES:
+        assert getattr(live, table) == getattr(fresh, table), table
+    assert {key: names for key, names in live.interested.items() if names} == fresh.interested
+
+
+def late_changes(schedule, steps=30):
+    # Registrations, cancellations and new selections in turn; checks that only the reported campers moved
+    rng = random.Random(5)
+    workshops = [workshop for workshop in schedule.configuration['workshops'] if workshop != "-"]
+    for step in range(steps):
+        before = sessions(schedule)
+        campers = list(schedule.configuration['campers'])
+        if step % 3 == 0:
+            camper_id = f'Late camper {step}'
+            changed = schedule.add_camper(camper_id, rng.choice(['Nanobyte', 'Kilobyte', 'Megabyte', 'Gigabyte']),
+                                          rng.sample(workshops, 4))
+        elif step % 3 == 1:
+            camper_id = rng.choice(campers)
+            changed = schedule.remove_camper(camper_id)
+        else:
+            camper_id = rng.choice(campers)
+            changed = schedule.change_preferences(camper_id, rng.sample(workshops, 4))
+        after = sessions(schedule)
+        moved = {other for other in before if other in after and before[other] != after[other]}
+        assert moved <= set(changed) | {camper_id}
+        assert_consistent(schedule)
+        assert_index_current(schedule.configuration)
+
+
+@pytest.mark.parametrize('schedule_cls', [Schedule, CompactSchedule])
+def test_late_changes_leave_schedules_sharing_the_configuration_alone(configuration, schedule_cls):
+    schedule = schedule_cls.from_schedule(FIFOSchedule(configuration))
+    copied = schedule.copy()
+    other = schedule_cls.from_schedule(FIFOSchedule(configuration))
+    originals = copy.deepcopy({key: value for key, value in configuration.items() if key != 'index'})
+    copied_sessions, other_sessions = sessions(copied), sessions(other)
+
+    late_changes(schedule)
+    assert schedule.configuration is not configuration
+    assert {key: value for key, value in configuration.items() if key != 'index'} == originals
+    assert_index_current(configuration)
+    for unchanged, unchanged_sessions in ((copied, copied_sessions), (other, other_sessions)):
+        assert unchanged.configuration is configuration
+        assert sessions(unchanged) == unchanged_sessions
+        assert_consistent(unchanged)
+
+    # The copy changes independently in turn, and the first schedule keeps its own changes
+    changed_sessions = sessions(schedule)
+    late_changes(copied, steps=9)
+    assert sessions(schedule) == changed_sessions
+    assert_consistent(schedule)
+    assert sessions(other) == other_sessions
+
+
+def test_waiting_campers_match_a_scan(configuration):
+    schedule = FIFOSchedule(configuration)
+    index = get_index(configuration)
+    freed = [(workshop, slot, key) for workshop in list(configuration['workshops'])[:6] for slot in range(3)
+             for key in ('young', 'old')]
+    expected = []
+    for camper_id, camper in configuration['campers'].items():
+        key = index.age_group_key(camper_id)
+        if any(workshop in camper['preferences'] and age_group_key == key and
+               not LocalSearch.preferred(camper['preferences'], schedule.schedule[camper_id][slot][0])
+               for workshop, slot, age_group_key in freed):
+            expected.append(camper_id)
+    assert LocalSearch.waiting_campers(schedule, freed) == expected
@@ -0,0 +1,46 @@
+import random
+
+from Model import Metrics
+from Model.CompactSchedule import CompactSchedule
+from Model.Schedule import Schedule
+
+
+def probe(schedule, configuration, probes=2000):
+    # can_assign and rejection_reason on random (camper, workshop, slot) triples, booking the ones that fit
+    answers = []
+    campers = list(configuration['campers'].items())
+    workshops = [workshop for workshop in configuration['workshops'] if workshop != "-"]
+    for _ in range(probes):
+        camper_id, camper = random.choice(campers)
+        workshop, slot = random.choice(workshops), random.randrange(3)
+        reason = schedule.rejection_reason(camper_id, workshop, slot, camper['age_group'])
+        allowed = schedule.can_assign(camper_id, workshop, slot, camper['age_group'])
+        assert allowed == (reason is None)
+        if allowed:
+            schedule.add_booking(camper_id, workshop, slot, camper['age_group'])
+            sessions = list(schedule.schedule.get(camper_id, [("-", s) for s in range(3)]))
+            sessions[slot] = (workshop, slot)
+            schedule.set_camper_sessions(camper_id, sessions)
+        answers.append(reason)
+    return answers
+
+
+def test_backends_reject_for_the_same_reasons(configuration):
+    random.seed(1)
+    answers = probe(Schedule(configuration), configuration)
+    random.seed(1)
+    assert probe(CompactSchedule(configuration), configuration) == answers
+    assert len(set(answers)) > 2
+
+
+def test_counters_come_from_can_assign_itself(configuration, monkeypatch):
+    can_assign = Schedule.can_assign
+    monkeypatch.setattr(Metrics, 'enabled', True)
+    Metrics.drain()
+    answers = probe(CompactSchedule(configuration), configuration, probes=500)
+
+    counters = Metrics.drain()['counters']
+    assert Schedule.can_assign is can_assign and 'can_assign' not in vars(CompactSchedule)
+    assert counters['can_assign.calls'] == 500
+    for reason in set(answers) - {None}:
+        assert counters[f'can_assign.rejected.{reason}'] == answers.count(reason)